@@ -1,10 +1,25 @@
 import pygame
+import numpy as np
+import asyncio
 import os
-from random import randint
+import sys
+import csv
+import tracemalloc
+import types
+from random import Random, getrandbits
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from itertools import product
-from time import time
+from time import time, perf_counter, sleep, strftime, localtime
+from bisect import bisect
+from threading import Lock, Thread, get_ident
+from queue import Queue
+from weakref import WeakKeyDictionary
 
 ARROWS = (pygame.K_UP, pygame.K_DOWN, pygame.K_RIGHT, pygame.K_LEFT)
+FONTS = {}  # (путь, размер) -> Font, общие для всех экранов и перезапусков
+TEXTS = {}  # (шрифт, текст, цвет) -> готовая надпись для неизменных строк
+IMAGES = {}  # (имя, colorkey) -> загруженная картинка
 
 
 class Quit(KeyboardInterrupt):
@@ -19,34 +34,202 @@ class Restart(Exception):
 
 
 def load_image(name, colorkey=None):
+    """
+    Картинка загружается при первом запросе и дальше берётся из IMAGES:
+    окно одно на всю работу (DisplayManager), и приведённая к его формату
+    картинка не устаревает
+    """
+    image = IMAGES.get((name, colorkey))
+    if image is not None:
+        return image
     fullname = os.path.join('data', 'images', name)
-    image = pygame.image.load(fullname)
+    image = IMAGES[(name, colorkey)] = pygame.image.load(fullname)
     if colorkey is not None:
         if colorkey == -1:
             colorkey = image.get_at((0, 0))
         image.set_colorkey(colorkey)
-    else:
-        image = image.convert_alpha()
+    elif pygame.display.get_surface() is not None:
+        # без окна display (TextureScreen) приводить не к чему
+        image = IMAGES[(name, colorkey)] = image.convert_alpha()
     return image
 
 
-def render_text(surface, text, text_coord, font, color=None):
+def get_font(name, size):
+    """Шрифт создаётся при первом запросе и дальше берётся из FONTS"""
+    font = FONTS.get((name, size))
+    if font is None:
+        font = FONTS[(name, size)] = pygame.font.Font(name, size)
+    return font
+
+
+def static_text(text, font, color):
+    """Неизменная надпись рендерится один раз и дальше берётся из TEXTS"""
+    key = (font, text, tuple(color))
+    surface = TEXTS.get(key)
+    if surface is None:
+        surface = TEXTS[key] = font.render(text, True, color)
+    return surface
+
+
+def render_text(surface, text, text_coord, font, color=None, static=False):
     if color is None:
         color = pygame.color.Color('white')
-    text_surface = font.render(text, True, color)
+    if static:
+        text_surface = static_text(text, font, color)
+    else:
+        text_surface = font.render(text, True, color)
     text_rect = text_surface.get_rect()
     text_rect.midtop = text_coord
     surface.blit(text_surface, text_rect)
     return text_rect.height
 
 
+def sweep(x, y, w, h, dx, dy, bx, by, bw, bh, ex=0, ey=0):
+    """
+    Непрерывная проверка пересечения за кадр (swept AABB).
+    Прямоугольник (x, y, w, h) сдвинулся за кадр на (dx, dy),
+    прямоугольники (bx, by, bw, bh) - на (ex, ey); координаты - конечные.
+    Аргументы - числа или массивы NumPy (с транслированием).
+    Возвращает время первого касания в долях кадра (0..1), inf - если
+    за кадр не пересекались. Касание краями, как и в Rect.colliderect,
+    пересечением не считается.
+    """
+    rx = np.asarray(dx - ex, dtype=float)
+    ry = np.asarray(dy - ey, dtype=float)
+    # начало движения относительно конечного положения второго прямоугольника
+    sx = x - rx
+    sy = y - ry
+    with np.errstate(divide='ignore', invalid='ignore'):
+        tx1 = (bx - w - sx) / rx
+        tx2 = (bx + bw - sx) / rx
+        ty1 = (by - h - sy) / ry
+        ty2 = (by + bh - sy) / ry
+    inside_x = (sx > bx - w) & (sx < bx + bw)
+    inside_y = (sy > by - h) & (sy < by + bh)
+    tx_in = np.where(rx == 0, np.where(inside_x, -np.inf, np.inf),
+                     np.minimum(tx1, tx2))
+    tx_out = np.where(rx == 0, np.where(inside_x, np.inf, -np.inf),
+                      np.maximum(tx1, tx2))
+    ty_in = np.where(ry == 0, np.where(inside_y, -np.inf, np.inf),
+                     np.minimum(ty1, ty2))
+    ty_out = np.where(ry == 0, np.where(inside_y, np.inf, -np.inf),
+                      np.maximum(ty1, ty2))
+    t_in = np.maximum(tx_in, ty_in)
+    t_out = np.minimum(tx_out, ty_out)
+    hit = ((t_in < t_out) & (t_in < 1) & (t_out > 0)
+           & (w > 0) & (h > 0) & (bw > 0) & (bh > 0))
+    return np.where(hit, np.maximum(t_in, 0), np.inf)
+
+
 def bgmus_play(bgmus=None):
     if bgmus is None:
         bgmus = '0'
-    bgmus_file = os.path.join('data', 'music', 'bgmus_' + bgmus + '.ogg')
-    music.load(bgmus_file)
-    if int(setter.get('music')):
-        music.play(-1)
+    music.play(bgmus, paused=not int(setter.get('music')))
+
+
+class MusicPlayer:
+    """
+    Фоновая музыка из data/music/bgmus_*.ogg.
+    Дорожки читаются и декодируются по одной в пуле потоков, фоновая
+    задача load_all только ждёт их, пока показывается главный экран,
+    поэтому play не блокирует игровой цикл: если дорожка ещё не готова,
+    её запустит update, когда она догрузится.
+    Дорожки играют по очереди на двух зарезервированных каналах,
+    поэтому смена дорожки - плавный переход одной в другую.
+    Без звукового устройства или без файлов музыка просто молчит.
+    Повторяет используемую игрой часть интерфейса pygame.mixer.music.
+    """
+    DIR = os.path.join('data', 'music')
+    FADE = 1500  # мс на переход между дорожками
+
+    def __init__(self):
+        self.tracks = {}
+        self.volume = 1
+        self.current = None
+        self.pending = None
+        self.paused = False
+        self.channels = []
+        self.active = 0
+        if pygame.mixer.get_init():
+            pygame.mixer.set_reserved(2)
+            self.channels = [pygame.mixer.Channel(0), pygame.mixer.Channel(1)]
+
+    async def load_all(self):
+        if not self.channels:
+            return None
+        try:
+            names = os.listdir(self.DIR)
+        except OSError:
+            return None
+        loop = asyncio.get_running_loop()
+        # Музыка меню нужна первой
+        for name in sorted(names, key=lambda name: name != 'bgmus_menu.ogg'):
+            if name.startswith('bgmus_') and name.endswith('.ogg'):
+                try:
+                    # декодирование целой дорожки - дольше кадра
+                    sound = await loop.run_in_executor(
+                        None, pygame.mixer.Sound, os.path.join(self.DIR, name))
+                except pygame.error:
+                    continue
+                self.tracks[name[len('bgmus_'):-len('.ogg')]] = sound
+
+    def play(self, track, paused=False):
+        self.pending = track
+        self.paused = paused
+        self.update()
+
+    def update(self):
+        """Запускает отложенную дорожку, если она уже загрузилась"""
+        if self.pending not in self.tracks:
+            return None
+        old = self.channels[self.active]
+        if self.pending == self.current and old.get_busy():
+            self.pending = None
+            return None
+        fade = self.FADE if old.get_busy() and not self.paused else 0
+        if fade:
+            old.fadeout(fade)
+        else:
+            old.stop()
+        self.active = 1 - self.active
+        new = self.channels[self.active]
+        new.set_volume(self.volume)
+        new.play(self.tracks[self.pending], loops=-1, fade_ms=fade)
+        if self.paused:
+            new.pause()
+        self.current = self.pending
+        self.pending = None
+
+    def get_volume(self):
+        return self.volume
+
+    def set_volume(self, volume):
+        self.volume = volume
+        for channel in self.channels:
+            channel.set_volume(volume)
+
+    def pause(self):
+        self.paused = True
+        for channel in self.channels:
+            channel.pause()
+
+    def unpause(self):
+        self.paused = False
+        if self.channels:
+            self.channels[self.active].unpause()
+
+    def rewind(self):
+        if self.current is not None:
+            channel = self.channels[self.active]
+            channel.play(self.tracks[self.current], loops=-1)
+            if self.paused:
+                channel.pause()
+
+    def stop(self):
+        self.current = None
+        self.pending = None
+        for channel in self.channels:
+            channel.stop()
 
 
 class SettingsFile:
@@ -56,11 +239,18 @@ class SettingsFile:
     После завершения программы файл удаляется
     """
     NAME = '~temp'
-    OPTIONS = {'size': 0, 'music': 1}
+    OPTIONS = {'size': 0, 'music': 1, 'logical': 2, 'renderer': 3,
+               'latency': 4, 'profile': 5, 'allocations': 6, 'pipeline': 7,
+               'capture': 8, 'fps': 9, 'menu_fps': 10, 'pacing': 11}
 
     def __init__(self):
         with open(self.NAME, 'w') as f:
-            f.writelines(('size = 0x0\n', 'music = 1\n'))
+            f.writelines(('size = 0x0\n', 'music = 1\n', 'logical = 0x0\n',
+                          'renderer = software\n', 'latency = 0\n',
+                          'profile = 0\n', 'allocations = 0\n',
+                          'pipeline = 0\n', 'capture = 0\n',
+                          'fps = 30\n', 'menu_fps = 25\n',
+                          'pacing = precise\n'))
 
     def __del__(self):
         os.remove(self.NAME)
@@ -111,18 +301,21 @@ class StatisticsFile:
             self.reset()
 
     def add_stat(self, stat):
-        death, level, vel, score = stat
+        self.add_stats((stat,))
+
+    def add_stats(self, new_stats):
+        """Добавляет сразу несколько итогов за одно чтение и запись файла"""
         stats = self.get_all()
 
-        stats['deaths'][death] += 1
-        n = sum(stats['deaths'])
+        for (death, level, vel, score) in new_stats:
+            stats['deaths'][death] += 1
 
-        if level > stats['bestlevel'][0]:
-            stats['bestlevel'][0] = level
+            if level > stats['bestlevel'][0]:
+                stats['bestlevel'][0] = level
 
-        stats['highscores'].append(score)
+            stats['highscores'].append(score)
         stats['highscores'].sort(reverse=True)
-        stats['highscores'].pop()  # Остаются только 5 лучших
+        del stats['highscores'][5:]  # Остаются только 5 лучших
 
         stats = tuple(' = '.join((key, ' '.join((str(x) for x in val)))) + '\n'
                       for (key, val) in stats.items())
@@ -146,6 +339,757 @@ class StatisticsFile:
         return stats
 
 
+class RunHistory:
+    """
+    История игр по столбцам: итог каждой игры (время, тип смерти, уровень,
+    скорость, счёт) дописывается в конец файла своего столбца в DIR.
+    Рядом лежит сводка, которая пересчитывается при каждой записи:
+    число игр, суммы, распределения счёта и уровня и смерти по типам
+    для групп из TREND игр подряд (хранятся последние TREND_GROUPS групп).
+    Экрану статистики хватает сводки и хвоста столбцов, поэтому он
+    открывается одинаково быстро при любом числе игр;
+    столбцы целиком читает только export.
+    """
+    DIR = os.path.join('data', 'history')
+    SUMMARY = 'summary.txt'
+    COLUMNS = {'time': '<f8', 'death': 'u1', 'level': '<u2',
+               'speed': '<i4', 'score': '<i4'}
+    SCORE_BINS = (500, 1000, 2000, 3000, 4000, 5000, 7500, 10000)
+    LEVEL_BINS = (2, 3, 4, 5, 7, 10, 15, 20)
+    TREND = 20
+    TREND_GROUPS = 12
+    WINDOW = 20  # игр в скользящем среднем
+
+    def path(self, name):
+        return os.path.join(self.DIR, name)
+
+    def reset(self):
+        os.makedirs(self.DIR, exist_ok=True)
+        for name in self.COLUMNS:
+            if os.path.exists(self.path(name + '.bin')):
+                os.remove(self.path(name + '.bin'))
+        self.set_summary({'runs': [0], 'totals': [0, 0, 0],
+                          'scores': [0] * (len(self.SCORE_BINS) + 1),
+                          'levels': [0] * (len(self.LEVEL_BINS) + 1),
+                          'trend': []})
+
+    def __init__(self):
+        try:
+            summary = self.get_summary()
+            if not(len(summary['runs']) == 1 and
+                   len(summary['totals']) == 3 and
+                   len(summary['scores']) == len(self.SCORE_BINS) + 1 and
+                   len(summary['levels']) == len(self.LEVEL_BINS) + 1 and
+                   len(summary['trend']) % 3 == 0):
+                self.reset()
+        except (FileNotFoundError, ValueError, KeyError):
+            self.reset()
+
+    def get_summary(self):
+        with open(self.path(self.SUMMARY)) as f:
+            summary = dict(line.rstrip('\n').split(' =') for line in f)
+        return {key: [int(x) for x in val.split()]
+                for (key, val) in summary.items()}
+
+    def set_summary(self, summary):
+        with open(self.path(self.SUMMARY), 'w') as f:
+            f.writelines(' ='.join((key, ''.join(f' {x}' for x in val))) + '\n'
+                         for (key, val) in summary.items())
+
+    def add_runs(self, results):
+        """
+        Дописывает итоги игр (как для StatisticsFile, последним - время
+        конца игры) и обновляет сводку
+        """
+        summary = self.get_summary()
+        columns = {name: [] for name in self.COLUMNS}
+        for (death, level, vel, score, ended) in results:
+            for (name, value) in zip(self.COLUMNS,
+                                     (ended, death, level, vel, score)):
+                columns[name].append(value)
+
+            if summary['runs'][0] % self.TREND == 0:
+                summary['trend'] += [0, 0, 0]
+                del summary['trend'][:-3 * self.TREND_GROUPS]
+            summary['trend'][death - 3] += 1
+            summary['runs'][0] += 1
+            for (i, value) in enumerate((score, level, vel)):
+                summary['totals'][i] += value
+            summary['scores'][bisect(self.SCORE_BINS, score)] += 1
+            summary['levels'][bisect(self.LEVEL_BINS, level)] += 1
+
+        for (name, dtype) in self.COLUMNS.items():
+            with open(self.path(name + '.bin'), 'ab') as f:
+                np.array(columns[name], dtype).tofile(f)
+        self.set_summary(summary)
+
+    def column(self, name, last=None):
+        """Столбец целиком или только последние last значений"""
+        dtype = np.dtype(self.COLUMNS[name])
+        try:
+            size = os.path.getsize(self.path(name + '.bin')) // dtype.itemsize
+        except FileNotFoundError:
+            return np.zeros(0, dtype)
+        count = size if last is None else min(last, size)
+        with open(self.path(name + '.bin'), 'rb') as f:
+            f.seek((size - count) * dtype.itemsize)
+            return np.fromfile(f, dtype, count)
+
+    def export(self, path):
+        """Записывает всю историю в CSV, возвращает число игр"""
+        columns = [self.column(name) for name in self.COLUMNS]
+        runs = min(len(column) for column in columns)
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(self.COLUMNS)
+            writer.writerows(zip(*(column[:runs].tolist()
+                                   for column in columns)))
+        return runs
+
+
+class InputLatency:
+    """
+    Замер задержки от нажатия (или отпускания) стрелки до вывода кадра,
+    в котором оно уже учтено. Время события берётся из event.timestamp,
+    если pygame его даёт; pygame 2 его не даёт, и тогда событие считается
+    пришедшим сразу после прошлой выборки очереди (polled) - раньше оно
+    прийти не могло, так что это верхняя оценка, включая ожидание
+    в очереди. Нижняя оценка - от выборки, в которой событие пришло.
+    Нажатие учтено в кадре, когда шаг мира взял стрелки (step_taken);
+    выводится этот кадр при следующем frame_shown.
+    Копит гистограмму верхней оценки в миллисекундах и выводит её текстом.
+    """
+    BINS = (5, 10, 15, 20, 25, 33, 40, 50, 67, 100)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BINS) + 1)
+        self.incoming = []
+        self.pending = []
+        self.dequeued = 0  # сумма нижних оценок, мс
+        self.polls = [pygame.time.get_ticks()] * 2  # прошлая и эта выборки
+
+    def polled(self):
+        """Вызывается сразу после выборки очереди событий"""
+        self.polls = [self.polls[1], pygame.time.get_ticks()]
+
+    def key_event(self, event):
+        self.incoming.append((getattr(event, 'timestamp', self.polls[0]),
+                              self.polls[1]))
+
+    def step_taken(self):
+        self.pending += self.incoming
+        self.incoming.clear()
+
+    def frame_shown(self):
+        now = pygame.time.get_ticks()
+        for (earliest, dequeued) in self.pending:
+            self.counts[bisect(self.BINS, now - earliest)] += 1
+            self.dequeued += now - dequeued
+        self.pending.clear()
+
+    def report(self):
+        total = sum(self.counts)
+        mean = self.dequeued / total if total else 0
+        lines = [f"Задержка ввода (от прошлой выборки очереди до вывода), "
+                 f"нажатий: {total}; от выборки события в среднем "
+                 f"{mean:.1f} мс"]
+        bounds = (0,) + self.BINS
+        for (i, count) in enumerate(self.counts):
+            if i < len(self.BINS):
+                name = f"{bounds[i]:>3}-{self.BINS[i]:<3} мс"
+            else:
+                name = f"{self.BINS[-1]:>3}+    мс"
+            share = count / total if total else 0
+            lines.append(f"{name} {count:>6} {'#' * round(share * 50)}")
+        return '\n'.join(lines)
+
+
+class Profiler:
+    """
+    Профилировщик игры: счётчики за кадр (count) и время этапов (add_time),
+    которые копятся за всю игру и выводятся средними на кадр.
+    phase отмечает конец этапа кадра: время с прошлой отметки идёт в этап.
+    Считает всегда (это дешевле проверок), печатается только с --profile.
+    С allocations (--allocations) через tracemalloc ещё считает по этапам
+    пик памяти над её уровнем в начале этапа (reset_peak в каждой отметке):
+    временные поверхности, Rect и кортежи, созданные и освобождённые
+    внутри этапа, в чистом приросте не видны, а в пике видны. В отчёте
+    ещё места, где память выросла больше всего за игру (сравнение
+    снимков в начале и в конце).
+    Отметки этапов у каждого потока свои (шаг мира может идти в своём).
+    """
+    TOP = 10
+
+    def __init__(self, allocations=False):
+        self.frames = 0
+        self.counts = {}
+        self.times = {}
+        self.samples = {}
+        self.marks = {get_ident(): perf_counter()}
+        self.allocations = allocations
+        self.memory = 0
+        self.snapshot = None
+        if allocations:
+            tracemalloc.start()
+            self.snapshot = tracemalloc.take_snapshot()
+            self.memory = tracemalloc.get_traced_memory()[0]
+
+    def frame(self):
+        self.frames += 1
+
+    def phase(self, name):
+        now = perf_counter()
+        self.add_time(name, now - self.marks.get(get_ident(), now))
+        if self.allocations:
+            (memory, peak) = tracemalloc.get_traced_memory()
+            self.count(name + ', пик байт', peak - self.memory)
+            tracemalloc.reset_peak()
+            self.memory = memory
+        self.marks[get_ident()] = perf_counter()
+
+    def count(self, name, n=1):
+        self.counts[name] = self.counts.get(name, 0) + n
+
+    def add_time(self, name, seconds):
+        self.times[name] = self.times.get(name, 0) + seconds
+
+    def sample(self, name, seconds):
+        """Разовые замеры (не за кадр), в отчёте - среднее и максимум"""
+        self.samples.setdefault(name, []).append(seconds)
+
+    def skip(self):
+        """Время с прошлой отметки не относится ни к одному этапу"""
+        self.marks[get_ident()] = perf_counter()
+
+    def report(self):
+        frames = max(self.frames, 1)
+        lines = [f"Профиль, кадров: {self.frames}"]
+        for (name, n) in self.counts.items():
+            lines.append(f"{name:<24} {n / frames:10.2f} за кадр")
+        for (name, t) in self.times.items():
+            lines.append(f"{name:<24} {1000 * t / frames:10.3f} мс за кадр")
+        for (name, values) in self.samples.items():
+            lines.append(f"{name:<24} {1000 * sum(values) / len(values):10.3f}"
+                         f" мс в среднем, разброс {1000 * np.std(values):.3f}"
+                         f" мс, {1000 * max(values):.3f} мс максимум,"
+                         f" раз: {len(values)}")
+        if self.allocations and tracemalloc.is_tracing():
+            lines.append("Рост памяти за игру:")
+            diff = tracemalloc.take_snapshot().compare_to(self.snapshot,
+                                                          'lineno')
+            lines.extend(str(stat) for stat in diff[:self.TOP])
+        return '\n'.join(lines)
+
+    def close(self):
+        if self.allocations:
+            tracemalloc.stop()
+
+
+class StatisticsWriter:
+    """
+    Отложенная запись статистики, чтобы экран конца игры не ждал диска.
+    Итоги игр копятся в очереди своего места записи (sinks: файл
+    статистики и история), фоновая задача run собирает их в пачку
+    (ждёт ещё interval секунд после первого) и записывает разом
+    в пуле потоков, так что кадры игры диск не ждут. flush записывает
+    всё накопленное сразу (в том потоке, где вызван), close
+    вызывается при выходе. Итог уходит из очереди только после удачной
+    записи, поэтому при ошибке он не теряется: испорченный файл (например,
+    правленный руками) проверяется заново, как при запуске, и запись
+    повторяется; другие ошибки run сообщает и повторяет запись позже.
+    """
+
+    def __init__(self, interval=5):
+        self.added = None  # asyncio.Event задачи run
+        self.interval = interval
+        self.lock = Lock()  # flush идёт и в потоке run, и в главном
+        self.file = StatisticsFile()
+        self.history = RunHistory()
+        self.stats = []
+        self.runs = []  # итоги с временем конца игры
+        self.sinks = [(self.write_stats, self.stats),
+                      (self.write_runs, self.runs)]
+
+    def write_stats(self, stats):
+        try:
+            self.file.add_stats(stats)
+        except (ValueError, KeyError, IndexError):
+            self.file = StatisticsFile()
+            self.file.add_stats(stats)
+
+    def write_runs(self, runs):
+        try:
+            self.history.add_runs(runs)
+        except (ValueError, KeyError, IndexError):
+            self.history = RunHistory()
+            self.history.add_runs(runs)
+
+    def pending(self):
+        return any(queue for (_, queue) in self.sinks)
+
+    def add_stat(self, stat, ended=None):
+        """stat - итог игры, ended - время её конца (по умолчанию - сейчас)"""
+        self.stats.append(stat)
+        self.runs.append((*stat, time() if ended is None else ended))
+        if self.added is not None:
+            self.added.set()
+
+    def flush(self):
+        error = None
+        with self.lock:
+            for (write, queue) in self.sinks:
+                stats = queue[:]
+                if not stats:
+                    continue
+                try:
+                    write(stats)
+                except Exception as caught:
+                    error = error or caught
+                    continue
+                del queue[:len(stats)]
+        if error is not None:
+            raise error
+
+    def close(self):
+        try:
+            self.flush()
+        except Exception as error:
+            print("Статистика не записана:", repr(error))
+
+    async def run(self):
+        """Фоновая задача: запись идёт в потоке, кадры её не ждут"""
+        self.added = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        while True:
+            if not self.pending():
+                await self.added.wait()
+            await asyncio.sleep(self.interval)
+            self.added.clear()
+            try:
+                await loop.run_in_executor(None, self.flush)
+            except Exception as error:
+                print("Статистика не записана, повтор позже:", repr(error))
+
+
+class Simulation(Thread):
+    """
+    Поток шага мира для конвейера Game.run: пока главный поток рисует
+    и выводит кадр N по его снимку, здесь считается кадр N + 1
+    (Game.simulate). step отдаёт стрелки, result дожидается итога шага;
+    исключение шага выбрасывается в главном потоке.
+    """
+
+    def __init__(self, game):
+        super().__init__(daemon=True)
+        self.game = game
+        self.requests = Queue()
+        self.results = Queue()
+        self.start()
+
+    def run(self):
+        while True:
+            arrows = self.requests.get()
+            if arrows is None:
+                return None
+            self.game.profiler.skip()
+            try:
+                self.results.put((self.game.simulate(arrows), None))
+            except Exception as error:
+                self.results.put((None, error))
+
+    def step(self, arrows):
+        self.requests.put(arrows)
+
+    def result(self):
+        result, error = self.results.get()
+        if error is not None:
+            raise error
+        return result
+
+    def close(self):
+        self.requests.put(None)
+        self.join()
+
+
+class FlightRecorder:
+    """
+    Бортовой самописец: последние SECONDS секунд игры по кадрам -
+    положение ракеты, энергия, нажатые стрелки (биты Up, Down, Right, Left),
+    уровень, осколок, сдвиг фона и NEAR ближайших к ракете астероидов.
+    Всё в экранных координатах кадра. Буфер кольцевой и выделяется один
+    раз, запись кадра только заполняет его строку; ближайшие астероиды
+    ищутся NumPy в заранее выделенных рабочих массивах (nearest).
+    При гибели (dump) буфер от старых кадров к новым пишется в DIR
+    одним файлом: заголовок HEADER и кадры FRAME; хранятся последние KEEP.
+    Смотреть записи - flight_viewer.py.
+    """
+    DIR = os.path.join('data', 'flights')
+    SECONDS = 10
+    NEAR = 16
+    KEEP = 20
+    MAGIC = b'ASFR'
+    VERSION = 2
+    HEADER = np.dtype([('magic', 'S4'), ('version', 'u1'), ('fps', 'u1'),
+                       ('width', '<u2'), ('height', '<u2'), ('near', 'u1'),
+                       ('death', 'u1'), ('frames', '<u4'), ('total', '<u4')])
+
+    @staticmethod
+    def frame_dtype(near):
+        return np.dtype([('rocket', '<i2', 2), ('arrows', 'u1'),
+                         ('fuel', '<f4'), ('level', '<u2'),
+                         ('shard', '<i4', 2), ('shard_frame', 'u1'),
+                         ('fon', '<i2', 2), ('asteroids_n', 'u1'),
+                         ('asteroids', '<i2', (near, 2))])
+
+    def __init__(self, fps):
+        self.fps = fps
+        self.capacity = int(self.SECONDS * fps)
+        self.frames = np.zeros(self.capacity, self.frame_dtype(self.NEAR))
+        self.count = 0
+        self.grow(64)
+
+    def reset(self):
+        self.count = 0
+
+    def grow(self, size):
+        """Рабочие массивы nearest на size астероидов"""
+        self.positions = np.zeros((size, 2), '<i2')
+        self.offsets = np.zeros((size, 2), np.int64)
+        self.keys = np.zeros(size, np.int64)
+        self.order = np.arange(size)
+
+    def nearest(self, asteroids, target):
+        """
+        Места (левый верхний угол) астероидов - в positions, номера
+        ближайших NEAR из них к target (по сумме модулей разностей,
+        target - в координатах левого верхнего угла) - в keys по порядку.
+        Возвращает, сколько их
+        """
+        n = len(asteroids)
+        if n > len(self.keys):
+            self.grow(2 * n)
+        positions = self.positions
+        for (i, ast) in enumerate(asteroids):
+            positions[i, 0] = ast.rect.x
+            positions[i, 1] = ast.rect.y
+        offsets = self.offsets[:n]
+        keys = self.keys[:n]
+        np.subtract(positions[:n], target, out=offsets)
+        np.abs(offsets, out=offsets)
+        np.sum(offsets, axis=1, out=keys)
+        # расстояние * n + номер: при равных расстояниях - порядок списка
+        np.multiply(keys, n, out=keys)
+        np.add(keys, self.order[:n], out=keys)
+        k = min(n, self.NEAR)
+        if n > k:
+            keys.partition(k - 1)
+        keys[:k].sort()
+        np.remainder(keys[:k], max(n, 1), out=keys[:k])
+        return k
+
+    def record(self, game, arrows):
+        frame = self.frames[self.count % self.capacity]
+        rocket = game.rocket.rect
+        frame['rocket'] = rocket.topleft
+        frame['arrows'] = (arrows[0] | arrows[1] << 1 |
+                           arrows[2] << 2 | arrows[3] << 3)
+        frame['fuel'] = game.rocket.fuel
+        frame['level'] = game.level
+        frame['shard'] = game.energy_shatters.rect.topleft
+        frame['shard_frame'] = game.energy_shatters.cur_frame
+        frame['fon'] = game.fon.rect.topleft
+        # размер у всех астероидов один: близость центров - по углам
+        (w, h) = game.asteroids.image.get_size()
+        k = self.nearest(game.asteroids.asteroids,
+                         (rocket.centerx - w // 2, rocket.centery - h // 2))
+        frame['asteroids_n'] = k
+        np.take(self.positions, self.keys[:k], axis=0,
+                out=frame['asteroids'][:k])
+        self.count += 1
+
+    def dump(self, game, death):
+        """Записывает буфер в файл, возвращает его путь"""
+        start = self.count % self.capacity
+        if self.count <= self.capacity:
+            frames = self.frames[:self.count]
+        else:
+            frames = np.concatenate((self.frames[start:], self.frames[:start]))
+        header = np.array([(self.MAGIC, self.VERSION, self.fps, game.width,
+                            game.height, self.NEAR, death, len(frames),
+                            self.count)], self.HEADER)
+        os.makedirs(self.DIR, exist_ok=True)
+        # с мс: после мгновенного перезапуска гибели бывают в одну секунду
+        now = time()
+        path = os.path.join(self.DIR, strftime('flight_%Y%m%d_%H%M%S',
+                                               localtime(now))
+                            + f'_{int(now % 1 * 1000):03d}.bin')
+        with open(path, 'wb') as f:
+            header.tofile(f)
+            frames.tofile(f)
+        for name in sorted(os.listdir(self.DIR))[:-self.KEEP]:
+            os.remove(os.path.join(self.DIR, name))
+        return path
+
+    @classmethod
+    def load(cls, path):
+        """Возвращает заголовок и кадры записи"""
+        with open(path, 'rb') as f:
+            header = np.fromfile(f, cls.HEADER, 1)
+            if len(header) == 0 or header[0]['magic'] != cls.MAGIC:
+                raise ValueError(f"{path}: не запись самописца")
+            if header[0]['version'] != cls.VERSION:
+                raise ValueError(f"{path}: другая версия записи")
+            header = header[0]
+            frames = np.fromfile(f, cls.frame_dtype(header['near']),
+                                 header['frames'])
+        return header, frames
+
+
+class GameState:
+    """
+    Состояние игры одним двоичным блоком (dump) и обратно (restore):
+    заголовок HEADER (ракета, осколок, параметры Asteroids, камера, фон,
+    начало мира, время игры), места астероидов, куски мира CHUNK
+    (место осколка, состояние Random, число готовых мест появления)
+    и сами эти места. Частицы не сохраняются.
+    Дробные остатки движения ракеты и астероидов (carry) сохраняются
+    вместе с местами, так что восстановленная игра идёт так же.
+    Восстанавливается только в игру того же размера и частоты кадров.
+    Игра так сохраняется при закрытии окна (SUSPEND, продолжается при
+    следующем запуске игры) и на каждом новом уровне (повтор с начала
+    уровня); блок годится и для запуска многих игр без окна с одного места.
+    """
+    SUSPEND = os.path.join('data', 'suspend.bin')
+    MAGIC = b'ASGS'
+    VERSION = 2
+    HEADER = np.dtype([('magic', 'S4'), ('version', 'u1'), ('fps', 'u1'),
+                       ('width', '<u2'), ('height', '<u2'), ('seed', '<u4'),
+                       ('level', '<u2'), ('play_time', '<f8'),
+                       ('rocket', '<i4', 4), ('rocket_carry', '<f8', 2),
+                       ('fuel', '<f8'),
+                       ('shard', '<i4', 2), ('shard_frame', 'u1'),
+                       ('shard_i', '<f8'), ('ast_i', '<i4'), ('ast_t0', '<f8'),
+                       ('ast_n', '<i4'), ('ast_v', '<f8'),
+                       ('asteroids', '<u2'), ('camera', '<i4', 2),
+                       ('fon', '<i4', 2), ('world', '<i4', 2),
+                       ('current', '<i4'), ('chunks', 'u1')])
+    CHUNK = np.dtype([('index', '<i4'), ('shard', '<i4', 2),
+                      ('rng', '<u4', 625), ('spawns', '<u2')])
+
+    @classmethod
+    def dump(cls, game):
+        world = game.world
+        chunks = np.zeros(len(world.chunks), cls.CHUNK)
+        spawns = []
+        for (row, (index, chunk)) in zip(chunks, world.chunks.items()):
+            row['index'] = index
+            row['shard'] = chunk.shard
+            row['rng'] = chunk.rng.getstate()[1]
+            row['spawns'] = len(chunk.spawns)
+            spawns.extend(chunk.spawns)
+        asteroids = game.asteroids
+        shard = game.energy_shatters
+        header = np.array([(
+            cls.MAGIC, cls.VERSION, game.fps, game.width, game.height,
+            game.seed, game.level, time() % (60 * 60 * 24 * 30) -
+            game.START_TIME, tuple(game.rocket.rect),
+            (game.rocket.carry_x, game.rocket.carry_y), game.rocket.fuel,
+            shard.rect.topleft, shard.cur_frame, shard.i, asteroids.i,
+            asteroids.t0, asteroids.n, asteroids.v, len(asteroids.asteroids),
+            (game.camera.dx, game.camera.dy), game.fon.rect.topleft,
+            world.rect.topleft, world.current, len(chunks))], cls.HEADER)
+        return b''.join((
+            header.tobytes(),
+            np.array([ast.rect.topleft for ast in asteroids.asteroids],
+                     '<i4').tobytes(),
+            np.array([ast.carry for ast in asteroids.asteroids],
+                     '<f8').tobytes(),
+            chunks.tobytes(), np.array(spawns, '<u2').tobytes()))
+
+    @classmethod
+    def restore(cls, game, data):
+        """Переносит состояние в игру сразу после reset"""
+        header = np.frombuffer(data, cls.HEADER, 1)
+        if len(header) == 0 or header[0]['magic'] != cls.MAGIC:
+            raise ValueError("не сохранённая игра")
+        header = header[0]
+        if header['version'] != cls.VERSION:
+            raise ValueError("другая версия сохранённой игры")
+        if (header['fps'], header['width'], header['height']) != (
+                game.fps, game.width, game.height):
+            raise ValueError("игра сохранена с другим размером или частотой")
+        offset = cls.HEADER.itemsize
+        positions = np.frombuffer(data, '<i4', 2 * header['asteroids'], offset)
+        offset += positions.nbytes
+        carries = np.frombuffer(data, '<f8', header['asteroids'], offset)
+        offset += carries.nbytes
+        chunks = np.frombuffer(data, cls.CHUNK, header['chunks'], offset)
+        offset += chunks.nbytes
+        spawns = np.frombuffer(data, '<u2', offset=offset).tolist()
+
+        game.seed = int(header['seed'])
+        game.level = int(header['level'])
+        game.START_TIME = (time() % (60 * 60 * 24 * 30) -
+                           float(header['play_time']))
+        world = game.world = World(game.seed, game.width, game.LEVEL_H)
+        world.rect.topleft = header['world'].tolist()
+        world.current = int(header['current'])
+        start = 0
+        for row in chunks:
+            rng = Random.__new__(Random)  # без засева: состояние задаётся тут же
+            rng.setstate((3, tuple(row['rng'].tolist()), None))
+            chunk = world.chunks[int(row['index'])] = WorldChunk(
+                rng, tuple(row['shard'].tolist()))
+            end = start + 2 * int(row['spawns'])
+            chunk.spawns.extend(zip(spawns[start:end:2],
+                                    spawns[start + 1:end:2]))
+            start = end
+
+        # размер тоже: уменьшение для столкновений его округляет
+        game.rocket.rect = pygame.Rect(header['rocket'].tolist())
+        game.rocket.carry_x, game.rocket.carry_y = (
+            header['rocket_carry'].tolist())
+        game.rocket.fuel = float(header['fuel'])
+        shard = game.energy_shatters
+        shard.rect.topleft = header['shard'].tolist()
+        shard.cur_frame = int(header['shard_frame'])
+        shard.image = shard.frames[shard.cur_frame]
+        shard.i = float(header['shard_i'])
+        asteroids = game.asteroids
+        for ast in asteroids.asteroids:
+            ast.kill()
+        asteroids.asteroids = []
+        positions = positions.tolist()
+        for (i, carry) in enumerate(carries.tolist()):
+            asteroids.add(positions[2 * i], positions[2 * i + 1])
+            asteroids.asteroids[-1].carry = carry
+        asteroids.i = int(header['ast_i'])
+        asteroids.t0 = float(header['ast_t0'])
+        asteroids.n = int(header['ast_n'])
+        asteroids.v = float(header['ast_v'])
+        game.camera.dx, game.camera.dy = header['camera'].tolist()
+        game.fon.rect.topleft = header['fon'].tolist()
+        game.stat_bar.update()
+
+
+class Capture:
+    """
+    Запись игры для QA и настройки: каждый выведенный кадр (frame)
+    копируется из поверхности экрана через буферный протокол как есть,
+    без перевода формата, в один из BUFFERS заранее выделенных буферов.
+    Фоновая задача run по кадру за раз пишет их в свою папку в DIR -
+    одним файлом frames.raw (заголовок HEADER, затем кадры по
+    pitch * height байт, см. load) или, в режиме png, кадрами PNG
+    (save_png). Запись и сжатие идут в отдельном потоке, задача только
+    ждёт его, поэтому медленный диск не тормозит кадры.
+    Если свободного буфера нет (запись не успевает), кадр пропускается
+    и считается в dropped - игра запись не ждёт.
+    """
+    DIR = os.path.join('data', 'captures')
+    BUFFERS = 8
+    MAGIC = b'ASCP'
+    VERSION = 1
+    HEADER = np.dtype([('magic', 'S4'), ('version', 'u1'), ('fps', 'u1'),
+                       ('bytesize', 'u1'), ('width', '<u2'), ('height', '<u2'),
+                       ('pitch', '<u4'), ('shifts', 'u1', 4)])
+
+    def __init__(self, surface, fps, mode='raw'):
+        self.surface = surface
+        self.size = (self.width, self.height) = surface.get_size()
+        self.pitch = surface.get_pitch()
+        self.shifts = surface.get_shifts()
+        if surface.get_bytesize() != 4:
+            mode = 'raw'  # PNG собирается только из 32-битных пикселей
+        self.mode = mode
+        self.free = [bytearray(self.pitch * self.height)
+                     for _ in range(self.BUFFERS)]
+        self.filled = deque()
+        self.ready = asyncio.Event()
+        self.frames = 0
+        self.dropped = 0
+        self.copy_time = 0
+        self.copy_max = 0
+        self.path = os.path.join(self.DIR, strftime('capture_%Y%m%d_%H%M%S'))
+        os.makedirs(self.path, exist_ok=True)
+        self.file = None
+        if mode == 'raw':
+            self.file = open(os.path.join(self.path, 'frames.raw'), 'wb')
+            np.array([(self.MAGIC, self.VERSION, fps, surface.get_bytesize(),
+                       self.width, self.height, self.pitch, self.shifts)],
+                     self.HEADER).tofile(self.file)
+        self.executor = ThreadPoolExecutor(1)
+        self.task = scheduler.spawn('запись игры', self.run())
+
+    def frame(self):
+        start = perf_counter()
+        if not self.free:
+            self.dropped += 1
+            return None
+        buffer = self.free.pop()
+        memoryview(buffer)[:] = memoryview(self.surface.get_buffer())
+        self.filled.append((self.frames, buffer))
+        self.ready.set()
+        self.frames += 1
+        spent = perf_counter() - start
+        self.copy_time += spent
+        self.copy_max = max(self.copy_max, spent)
+
+    def save_png(self, index, buffer):
+        pixels = np.frombuffer(buffer, '<u4').reshape(
+            self.height, self.pitch // 4)[:, :self.width]
+        rgb = np.empty((self.height, self.width, 3), np.uint8)
+        for (i, shift) in enumerate(self.shifts[:3]):
+            rgb[..., i] = pixels >> shift
+        pygame.image.save(
+            pygame.image.frombuffer(rgb, self.size, 'RGB'),
+            os.path.join(self.path, f'frame_{index:06d}.png'))
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            if not self.filled:
+                self.ready.clear()
+                await self.ready.wait()
+            (index, buffer) = self.filled.popleft()
+            if self.file is not None:
+                await loop.run_in_executor(self.executor, self.file.write,
+                                           buffer)
+            else:
+                await loop.run_in_executor(self.executor, self.save_png,
+                                           index, buffer)
+            self.free.append(buffer)
+
+    def close(self):
+        """Дописывает очередь и возвращает отчёт"""
+        self.task.cancel()
+        self.executor.shutdown(wait=True)  # кадр, который уже пишется
+        while self.filled:
+            (index, buffer) = self.filled.popleft()
+            if self.file is not None:
+                self.file.write(buffer)
+            else:
+                self.save_png(index, buffer)
+        if self.file is not None:
+            self.file.close()
+        mean = self.copy_time / self.frames * 1000 if self.frames else 0
+        return (f"Запись игры в {self.path}: кадров {self.frames}, "
+                f"пропущено {self.dropped}; копирование кадра "
+                f"{mean:.2f} мс в среднем, до {self.copy_max * 1000:.2f} мс")
+
+    @classmethod
+    def load(cls, path):
+        """Заголовок и кадры frames.raw (байты строк как в поверхности)"""
+        with open(path, 'rb') as f:
+            header = np.fromfile(f, cls.HEADER, 1)
+        if len(header) == 0 or header[0]['magic'] != cls.MAGIC:
+            raise ValueError(f"{path}: не запись игры")
+        if header[0]['version'] != cls.VERSION:
+            raise ValueError(f"{path}: другая версия записи")
+        header = header[0]
+        frames = np.memmap(path, np.uint8, 'r', cls.HEADER.itemsize)
+        return header, frames.reshape(-1, header['height'], header['pitch'])
+
+
 class Camera:
     """
     Камера, привязанная к окну, которая обновляется на цель (цель оказывается в центре),
@@ -173,12 +1117,167 @@ class Camera:
                     2 * self.window.height // 3)
 
 
+class RenderGraph:
+    """
+    Порядок отрисовки кадра игры: слои NAMES снизу вверх.
+    Спрайты игры лежат в одной группе LayeredUpdates (game.all_sprites,
+    слой - атрибут _layer класса спрайта), поэтому каждый попадает в кадр
+    ровно один раз, в каких бы ещё группах ни состоял; рисуются только
+    видимые. Остальные слои (фон, частицы, строка состояния) дают свои
+    функции пар (картинка, место) из sources.
+    Слой можно пропустить (skip) или закэшировать (cache): тогда его пары
+    берутся с прошлого кадра, пока слой не отмечен изменившимся (changed).
+    Пар (вызовов blit) по слоям копится в профиле игры.
+    """
+    FON, SHARD, ASTEROIDS, PARTICLES, ROCKET, HUD = range(6)
+    NAMES = ('фон', 'осколок', 'астероиды', 'частицы', 'ракета', 'текст')
+
+    def __init__(self, game):
+        self.game = game
+        self.sources = {self.FON: game.fon.tiles,
+                        self.PARTICLES: game.particles.blits,
+                        self.HUD: game.stat_bar.blits}
+        self.skipped = set()
+        self.cached = {}  # слой -> пары прошлого кадра, None - собрать заново
+
+    def skip(self, layer, skipped=True):
+        if skipped:
+            self.skipped.add(layer)
+        else:
+            self.skipped.discard(layer)
+
+    def cache(self, layer, cached=True):
+        if cached:
+            self.cached[layer] = None
+        else:
+            self.cached.pop(layer, None)
+
+    def changed(self, layer):
+        if layer in self.cached:
+            self.cached[layer] = None
+
+    def pairs(self, layer):
+        source = self.sources.get(layer)
+        if source is not None:
+            return source()
+        return self.game.visible_blits(
+            self.game.all_sprites.get_sprites_from_layer(layer))
+
+    def frame(self):
+        """Пары (картинка, место) всего кадра для одного вызова blits"""
+        frame = []
+        for (layer, name) in enumerate(self.NAMES):
+            if layer in self.skipped:
+                continue
+            pairs = self.cached.get(layer)
+            if pairs is None:
+                pairs = self.pairs(layer)
+                if layer in self.cached:
+                    self.cached[layer] = pairs
+            self.game.profiler.count('слой ' + name, len(pairs))
+            frame += pairs
+        return frame
+
+
+class TextureScreen:
+    """
+    Экран игры на Renderer/Texture из pygame._sdl2 вместо программного
+    блитирования на display.get_surface().
+    Притворяется поверхностью (blit, blits, get_size), поэтому Fon,
+    группы спрайтов и render_text рисуют в него как обычно.
+    Каждая картинка загружается в текстуру один раз при первом выводе
+    (кэш по самой поверхности), кадр копит список текстур и выводится в flip.
+    Если после flip ничего не нарисовано, flip повторяет прошлый кадр
+    (пауза и конец игры рисуют один раз и только обновляют экран).
+    Окно своё (display.set_mode с рендерером не совместим), поэтому
+    полноэкранный режим переключается через toggle_fullscreen этого класса.
+    Сначала пробует аппаратный рендерер, при неудаче - программный SDL.
+    """
+
+    def __init__(self, size, logical=None, title="A Steroid Shower",
+                 vsync=False):
+        from pygame._sdl2.video import Window, Renderer, Texture
+        self.Texture = Texture
+        self.fullscreen = size == (0, 0)
+        if self.fullscreen:
+            self.window = Window(title, display.get_desktop_sizes()[0],
+                                 fullscreen_desktop=True)
+        else:
+            self.window = Window(title, size)
+        try:
+            self.renderer = Renderer(self.window, accelerated=1, vsync=vsync)
+        except (pygame.error, RuntimeError):
+            self.renderer = Renderer(self.window, accelerated=0)
+        if logical is not None:
+            self.renderer.logical_size = logical
+            self.size = logical
+        else:
+            self.size = self.window.size
+        self.textures = WeakKeyDictionary()
+        self.queue = []
+        self.presented = False
+
+    def get_size(self):
+        return self.size
+
+    def texture(self, surface):
+        texture = self.textures.get(surface)
+        if texture is None:
+            texture = self.Texture.from_surface(self.renderer, surface)
+            self.textures[surface] = texture
+        return texture
+
+    def blit(self, source, dest, area=None, special_flags=0):
+        if self.presented:
+            self.queue.clear()
+            self.presented = False
+        if area is not None:
+            area = pygame.Rect(area)
+            rect = pygame.Rect(dest[:2], area.size)
+        else:
+            rect = pygame.Rect(dest[:2], source.get_size())
+        self.queue.append((self.texture(source), area, rect))
+        return rect
+
+    def blit_changing(self, source, dest):
+        """Для поверхности, которая меняется от кадра к кадру (экран меню)"""
+        self.texture(source).update(source)
+        return self.blit(source, dest)
+
+    def blits(self, blit_sequence, doreturn=1):
+        rects = [self.blit(*item) for item in blit_sequence]
+        if doreturn:
+            return rects
+
+    def flip(self):
+        self.renderer.draw_color = (0, 0, 0, 255)
+        self.renderer.clear()
+        for (texture, area, rect) in self.queue:
+            texture.draw(srcrect=area, dstrect=rect)
+        self.renderer.present()
+        self.presented = True
+
+    def toggle_fullscreen(self):
+        if self.fullscreen:
+            self.window.set_windowed()
+        else:
+            self.window.set_fullscreen(desktop=True)
+        self.fullscreen = not self.fullscreen
+
+    def close(self):
+        self.textures.clear()
+        self.queue.clear()
+        self.renderer = None
+        self.window.destroy()
+
+
 class Fon:
     """
     Фон создаётся свой для каждого окна и привязан к нему
     Картинка замощает весь экран и отступ не больше размера картинки вокруг
     для соединения при движении
-    Обновляется и сам блитируется на экран
+    Обновляется и сам блитируется на экран (одним вызовом blits),
+    либо отдаёт плитки в общий список кадра (tiles)
     """
     
     def __init__(self, window):
@@ -190,12 +1289,177 @@ class Fon:
         self.rect.x = self.rect.x % self.rect.w
         self.rect.y = self.rect.y % self.rect.h
 
+    def tiles(self):
+        return [(self.image, self.rect.move(*shift))
+                for shift in product(range(-self.rect.w, self.window.width,
+                                           self.rect.w),
+                                     range(-self.rect.h, self.window.height,
+                                           self.rect.h))]
+
     def blit(self):
-        for shift in product(range(-self.rect.w, self.window.width,
-                                   self.rect.w),
-                             range(-self.rect.h, self.window.height,
-                                   self.rect.h)):
-            self.window.screen.blit(self.image, self.rect.move(*shift))
+        self.window.screen.blits(self.tiles(), doreturn=False)
+
+
+class DisplayManager:
+    """
+    Одно окно на всю работу программы.
+    Режим (размер окна, размер отрисовки, отрисовка текстурами) берётся
+    из настроек, окно пересоздаётся только при его изменении (apply).
+    Игра рисует прямо в screen, экраны меню - каждый в свою поверхность,
+    которая выводится по центру окна поверх фона (present); положение
+    мыши экраны меню переводят в свои координаты (scene_pos, scene_event).
+    С настройкой pacing = vsync вывод ждёт обновления монитора там,
+    где SDL это умеет (растяжение SCALED и текстуры); частота монитора
+    (refresh) тогда замеряется по нескольким выводам пустого кадра.
+    """
+    OPTIONS = ('size', 'logical', 'renderer')
+    REFRESH_FLIPS = 12
+
+    def __init__(self):
+        self.mode = None
+        self.screen = None
+        self.window = None  # окно, если рисуем не прямо в него
+        self.offset = (0, 0)  # левый верхний угол экрана меню
+        self.refresh = None  # кадров в секунду монитора при vsync
+
+    def apply(self):
+        """Возвращает bool -> пришлось ли открывать окно заново"""
+        mode = tuple(setter.get(option) for option in self.OPTIONS)
+        mode += (setter.get('pacing') == 'vsync',)
+        if mode == self.mode:
+            return False
+        if isinstance(self.screen, TextureScreen):
+            self.screen.close()
+        self.mode = mode
+        size, logical = (tuple(int(x) for x in value.split('x'))
+                         for value in mode[:2])
+        self.window = None
+        if (mode[2] != 'texture' or
+                not self.set_texture_screen(size, logical, mode[3])):
+            self.set_screen(size, logical, mode[3])
+        self.size = (self.width, self.height) = self.screen.get_size()
+        self.fon = Fon(self)
+        self.refresh = self.measure_refresh() if mode[3] else None
+        return True
+
+    def measure_refresh(self):
+        """Частота монитора по выводам с vsync или None, если вывод не ждёт"""
+        times = []
+        for _ in range(self.REFRESH_FLIPS):
+            self.flip()
+            times.append(perf_counter())
+        interval = float(np.median(np.diff(times)))
+        if interval < 0.002:  # vsync не включился
+            return None
+        return round(1 / interval)
+
+    def set_screen(self, size, logical, vsync=False):
+        if logical == (0, 0):
+            self.screen = display.set_mode(size)
+        elif hasattr(pygame, 'SCALED'):
+            flags = pygame.SCALED
+            if size == (0, 0):
+                flags |= pygame.FULLSCREEN
+            try:
+                self.screen = display.set_mode(logical, flags, vsync=vsync)
+            except pygame.error:
+                self.screen = display.set_mode(logical, flags)
+            if size != (0, 0) and size != logical:
+                # SCALED открывает окно по логическому размеру (с целым
+                # множителем), а размер из настроек задаётся окну отдельно
+                try:
+                    from pygame._sdl2.video import Window
+                    Window.from_display_module().size = size
+                except (ImportError, pygame.error):
+                    pass
+            size = logical  # в окно и во весь экран растягивает само SDL
+        else:
+            self.window = display.set_mode(size)
+            self.screen = pygame.Surface(logical).convert()
+        if size == (0, 0):
+            self.sure_fullscreen()
+
+    def set_texture_screen(self, size, logical, vsync=False):
+        """Возвращает bool -> удалось ли перейти на текстуры"""
+        display.init()
+        try:
+            self.screen = TextureScreen(size, None if logical == (0, 0)
+                                        else logical, vsync=vsync)
+        except (ImportError, pygame.error, RuntimeError):
+            return False
+        return True
+
+    def caption(self, text):
+        if isinstance(self.screen, TextureScreen):
+            self.screen.window.title = text
+        else:
+            display.set_caption(text)
+
+    def scene(self, size, caption):
+        """Готовит окно для экрана меню размера size, возвращает его поверхность"""
+        self.apply()
+        self.caption(caption)
+        self.offset = ((self.width - size[0]) // 2,
+                       (self.height - size[1]) // 2)
+        surface = pygame.Surface(size)
+        if display.get_surface() is not None:
+            surface = surface.convert()
+        return surface
+
+    def present(self, surface):
+        """Выводит экран меню по центру окна"""
+        self.fon.blit()
+        if isinstance(self.screen, TextureScreen):
+            self.screen.blit_changing(surface, self.offset)
+        else:
+            self.screen.blit(surface, self.offset)
+        self.flip()
+
+    def window_size(self):
+        if isinstance(self.screen, TextureScreen):
+            return self.screen.window.size
+        if self.window is not None:
+            return self.window.get_size()
+        return self.size
+
+    def scene_pos(self, pos, event=False):
+        """
+        Переводит положение мыши в окне в координаты экрана меню.
+        В событиях мыши окна с текстурами SDL уже перевёл его в размер
+        отрисовки (event=True), в mouse.get_pos() - нет
+        """
+        if not (event and isinstance(self.screen, TextureScreen)):
+            window_size = self.window_size()
+            pos = (pos[0] * self.width // window_size[0],
+                   pos[1] * self.height // window_size[1])
+        return (pos[0] - self.offset[0], pos[1] - self.offset[1])
+
+    def scene_event(self, event):
+        if not hasattr(event, 'pos'):
+            return event
+        return pygame.event.Event(
+            event.type, dict(event.dict, pos=self.scene_pos(event.pos, True)))
+
+    def flip(self):
+        """Выводит кадр на экран, растягивая его на окно при необходимости"""
+        if isinstance(self.screen, TextureScreen):
+            self.screen.flip()
+            return None
+        if self.window is not None:
+            pygame.transform.smoothscale(self.screen, self.window.get_size(),
+                                         self.window)
+        display.flip()
+
+    def sure_fullscreen(self):
+        full = display.toggle_fullscreen()
+        if not full:
+            display.toggle_fullscreen()
+
+    def toggle_fullscreen(self):
+        if isinstance(self.screen, TextureScreen):
+            self.screen.toggle_fullscreen()
+        else:
+            display.toggle_fullscreen()
 
 
 class ScrollBar:
@@ -221,7 +1485,7 @@ class ScrollBar:
             # если объекту передана подпись, то она создается
             # в виде текста над ползунком
             self.text = (text, pos.copy())
-            pos[1] += 20 + font.render(text, True, (0, 0, 0)).get_rect().h
+            pos[1] += 20 + font.size(text)[1]
 
         self.rect = self.scrollbar_image.get_rect()
         self.rect.midtop = pos
@@ -248,7 +1512,7 @@ class ScrollBar:
         render_text(screen, str(round(self.val)), self.val_pos, self.font)
         if self.text:
             render_text(screen, *self.text, self.font,
-                        pygame.color.Color('yellow'))
+                        pygame.color.Color('yellow'), static=True)
 
     def set_val(self, val):
         if val < self.min_val:
@@ -355,7 +1619,7 @@ class ButtonTable:
             rows = len(text)
         self.rows = rows
         if title is not None:
-            title_rect = font.render(title, True, self.WHITE).get_rect()
+            title_rect = pygame.Rect((0, 0), font.size(title))
             title_rect.midtop = (pos[0] + ((len(text) - 1) // rows) *
                                  x_shift // 2, pos[1])
             self.title = (title, title_rect.midtop)
@@ -372,7 +1636,7 @@ class ButtonTable:
             if i % rows == 0 and i != 0:
                 pos[0] += x_shift
                 pos[1] = pos0[1]
-            rect = font.render(line, True, self.WHITE).get_rect()
+            rect = pygame.Rect((0, 0), font.size(line))
             rect.midtop = pos
             self.buttons.append((line, rect))
             pos[1] += rect.h + y_shift
@@ -398,18 +1662,18 @@ class ButtonTable:
             self.focused = button_n
 
     def render(self, sheet):
-        render_text(sheet, *self.title, self.font, self.YELLOW)
+        render_text(sheet, *self.title, self.font, self.YELLOW, static=True)
         for button in self.buttons:
             render_text(sheet, button[0], button[1].midtop,
-                        self.font, self.WHITE)
+                        self.font, self.WHITE, static=True)
         if self.chosen is not None:
             chosen = self.buttons[self.chosen]
             render_text(sheet, chosen[0], chosen[1].midtop,
-                        self.font, self.YELLOW)
+                        self.font, self.YELLOW, static=True)
         if self.focused is not None:
             focused = self.buttons[self.focused]
             render_text(sheet, focused[0], focused[1].midtop,
-                        self.font, self.ORANGE)
+                        self.font, self.ORANGE, static=True)
 
     def get_button(self, pos):
         for (i, b) in enumerate(self.buttons):
@@ -514,23 +1778,28 @@ class TableSet:
 class Settings:    
     """
     Окно настроек, создаёт сет с таблицами размера экрана и музыки,
-    ползунком музыки и кнопкой назад.
-    Создаётся независимо от других окон, перехватывая экран.
+    ползунком музыки, таблицами размера отрисовки, частоты кадров игры
+    и ожидания кадра (FramePacer) и кнопкой назад.
+    Рисует в своей поверхности, окно общее (DisplayManager);
+    новый размер экрана применяется при выходе из настроек.
     """
     FONT_NAME = os.path.join('data', 'mr_AfronikG.ttf')
     SIZE_BUTTONS_TEXT = ("Полный экран", "1920x1080", "1600x1200",
                          "1440x1080", "1280x720", "960x540")
     MUS_BUTTONS_TEXT = ("Выкл", "Вкл")
-    SIZE = width, height = 720, 480
+    LOGICAL_BUTTONS_TEXT = ("Окно", "1280x720")
+    FPS_BUTTONS_TEXT = ("30", "60", "120")
+    PACING_BUTTONS_TEXT = ("Точно", "Vsync", "Нет")
+    PACING = ('precise', 'vsync', 'uncapped')
+    SIZE = width, height = 720, 540
 
     def __init__(self):
-        self.screen = display.set_mode(self.SIZE)
-        display.set_caption("Настройки")
+        self.screen = screen_manager.scene(self.SIZE, "Настройки")
         self.fon = Fon(self)
-        self.fps = 25
+        self.fps = int(setter.get('menu_fps'))
         
 
-        med_font = pygame.font.Font(self.FONT_NAME, 35)
+        med_font = get_font(self.FONT_NAME, 35)
         back_button = ButtonTable(("<= Назад",), [100, 30], med_font)
         h_inc = back_button[0][1].h
         start_h = 60 + h_inc + 20
@@ -544,11 +1813,40 @@ class Settings:
                                    mus_scrollbar.rect.w // 4,
                                    40 + mus_scrollbar.rect.bottom],
                                   med_font, x_shift=100, rows=1)
+        logical_buttons = ButtonTable(self.LOGICAL_BUTTONS_TEXT,
+                                      [self.width * 3 // 4 - 75,
+                                       40 + mus_buttons[0][1].bottom],
+                                      med_font, x_shift=150, rows=1,
+                                      title="Отрисовка")
+        fps_buttons = ButtonTable(self.FPS_BUTTONS_TEXT,
+                                  [self.width // 6 - 40,
+                                   20 + size_buttons[3][1].bottom],
+                                  med_font, x_shift=80, rows=1,
+                                  title="Кадров в игре")
+        pacing_buttons = ButtonTable(self.PACING_BUTTONS_TEXT,
+                                     [self.width * 3 // 4 - 110,
+                                      20 + logical_buttons[0][1].bottom],
+                                     med_font, x_shift=110, rows=1,
+                                     title="Ожидание кадра")
         self.buttons = TableSet(back_button, size_buttons,
-                                mus_scrollbar, mus_buttons)
+                                mus_scrollbar, mus_buttons, logical_buttons,
+                                fps_buttons, pacing_buttons)
         self.size_choose()
         self.music_choose()
-        self.run()
+        self.logical_choose()
+        self.pacing_choose()
+
+    def pacing_choose(self):
+        fps = setter.get('fps')
+        if fps not in self.FPS_BUTTONS_TEXT:
+            fps = '30'
+            setter.set('fps', fps)
+        self.buttons.choose(5, self.FPS_BUTTONS_TEXT.index(fps))
+        pacing = setter.get('pacing')
+        if pacing not in self.PACING:
+            pacing = 'precise'
+            setter.set('pacing', pacing)
+        self.buttons.choose(6, self.PACING.index(pacing))
 
     def music_choose(self):
         self.buttons.choose(2, music.get_volume() * 100)
@@ -565,10 +1863,21 @@ class Settings:
                 setter.set('size', '0x0')
                 self.buttons.choose(1, 0)
 
+    def logical_choose(self):
+        logical = setter.get('logical')
+        if logical == '0x0':
+            self.buttons.choose(4, 0)
+        else:
+            try:
+                self.buttons.choose(4, self.LOGICAL_BUTTONS_TEXT.index(logical))
+            except ValueError:
+                setter.set('logical', '0x0')
+                self.buttons.choose(4, 0)
+
     def render(self):
         self.fon.blit()
         self.buttons.render(self.screen)
-        display.flip()
+        screen_manager.present(self.screen)
 
     def events(self, event):
         if event.type == pygame.QUIT:
@@ -587,11 +1896,12 @@ class Settings:
             if res is not None:
                 self.bgmus_vol(res)
 
-    def run(self):
+    async def run(self):
         running = True
         arrow_pressed = [False, False, False, False]  # Up, Down, Right, Left
         while running:
             for event in pygame.event.get():
+                event = screen_manager.scene_event(event)
                 if self.events(event):
                     running = False
                 if event.type == pygame.KEYDOWN:
@@ -601,12 +1911,12 @@ class Settings:
                     if event.key in ARROWS:
                         arrow_pressed[ARROWS.index(event.key)] = False
 
-            self.buttons.update(mouse.get_pos(), arrow_pressed)
+            self.buttons.update(screen_manager.scene_pos(mouse.get_pos()),
+                                arrow_pressed)
             if self.buttons.focused[0] == 2 and any(arrow_pressed):
                 self.bgmus_vol(self.buttons[2].get_val())
             self.render()
-            clock.tick(self.fps)
-        display.quit()
+            await scheduler.frame(self.fps)
 
     def act(self, button):
         """Возвращает bool -> надо ли завершать"""
@@ -627,6 +1937,15 @@ class Settings:
                 music.rewind()
                 music.unpause()
                 setter.set('music', '1')
+        elif button[0] == 4:
+            if button[1] != 0:
+                setter.set('logical', self.buttons[4][button[1]][0])
+            else:
+                setter.set('logical', '0x0')
+        elif button[0] == 5:
+            setter.set('fps', self.FPS_BUTTONS_TEXT[button[1]])
+        elif button[0] == 6:
+            setter.set('pacing', self.PACING[button[1]])
         return False
 
     def get_resolution(self, button):
@@ -645,31 +1964,55 @@ class Settings:
 class Statistics:    
     """
     Окно статистики, выводит всю статистику и позволяет её сбросить,
-    создаёт кнопки сброс и назад.
+    создаёт кнопки сброс, назад и история.
+    История (RunHistory) - средние, распределения счёта и уровня
+    и смерти по группам игр - строится один раз при открытии окна.
+    Надписи статистики и истории рендерятся там же и хранятся в окне,
+    а не в общем TEXTS: они меняются от игры к игре.
     Перед сбросом уточняет намерение (предосторожность от случайного сброса).
-    Создаётся независимо от других окон, перехватывая экран.
+    Рисует в своей поверхности, окно общее (DisplayManager).
     """
     FONT_NAME = os.path.join('data', 'mr_AfronikG.ttf')
     SIZE = width, height = 960, 540
+    CHART_W = 240
+    # смерти: самоуничтожение, столкновение, нехватка энергии
+    DEATH_COLORS = tuple(pygame.color.Color(name)
+                         for name in ('yellow', 'red', 'cyan'))
+    BAR_COLOR = pygame.color.Color('orange')
 
     def __init__(self):
-        self.screen = display.set_mode(self.SIZE)
-        display.set_caption("Статистика")
+        self.screen = screen_manager.scene(self.SIZE, "Статистика")
         self.fon = Fon(self)
-        self.fps = 25
+        self.fps = int(setter.get('menu_fps'))
         
 
-        self.med_font = pygame.font.Font(self.FONT_NAME, 35)
+        self.med_font = get_font(self.FONT_NAME, 35)
+        self.small_font = get_font(self.FONT_NAME, 25)
         back_button = ButtonTable(("<= Назад",), [100, 30], self.med_font)
         reset_button = ButtonTable(("Сбросить статистику",),
                                    [self.width // 2, self.height * 5 // 6],
                                    self.med_font)
-        self.buttons = TableSet(back_button, reset_button)
-        self.stats = []
+        history_button = ButtonTable(("История",), [self.width - 110, 30],
+                                     self.med_font)
+        self.buttons = TableSet(back_button, reset_button, history_button)
+        self.show_history = False
+        try:
+            stat_writer.flush()
+        except Exception as error:
+            print("Статистика не записана:", repr(error))
         self.get_stats()
-        self.run()
+        self.get_history()
+
+    @staticmethod
+    def label(text, pos, font, color=None):
+        """Готовая надпись (поверхность, прямоугольник), pos - центр верха"""
+        if color is None:
+            color = pygame.color.Color('white')
+        surface = font.render(text, True, color)
+        return surface, surface.get_rect(midtop=pos)
 
     def get_stats(self):
+        self.stats = []
         pos = [self.width // 2, self.height // 6]
         stats = StatisticsFile().get_all(string=True)
         text = ((f"Смертей от столкновения: {stats['deaths'][1]}",
@@ -681,15 +2024,76 @@ class Statistics:
         pos0 = pos.copy()
         pos[0] -= self.width // 5
         for line in text[0]:
-            self.stats.append((line, pos.copy()))
-            pos[1] += 40 + self.med_font.render(line, True, (0, 0, 0)).get_rect().h
+            self.stats.append(self.label(line, pos, self.med_font))
+            pos[1] += 40 + self.med_font.size(line)[1]
         pos = pos0
         pos[0] += self.width // 4
         for line in text[1]:
-            self.stats.append((line, pos.copy()))
-            pos[1] += 20 + self.med_font.render(line, True, (0, 0, 0)).get_rect().h
+            self.stats.append(self.label(line, pos, self.med_font))
+            pos[1] += 20 + self.med_font.size(line)[1]
+
+    def get_history(self):
+        """Надписи и столбики диаграмм истории игр"""
+        self.history = []  # (надпись, прямоугольник)
+        self.bars = []  # (цвет, прямоугольник)
+        history = RunHistory()
+        summary = history.get_summary()
+        runs = summary['runs'][0]
+        pos = [self.width // 2, self.height // 6]
+        if runs == 0:
+            self.history.append(self.label("Игр пока не было", pos,
+                                           self.small_font))
+            return None
+        score, level, speed = (total / runs for total in summary['totals'])
+        self.history.append(self.label(
+            f"Игр: {runs}, в среднем счёт {score:.0f}, "
+            f"уровень {level:.1f}, скорость {speed:.0f}",
+            pos, self.small_font))
+        recent = [history.column(name, history.WINDOW)
+                  for name in ('score', 'level', 'speed')]
+        pos[1] += 35
+        self.history.append(self.label(
+            f"Последние {len(recent[0])}: счёт {recent[0].mean():.0f}, "
+            f"уровень {recent[1].mean():.1f}, "
+            f"скорость {recent[2].mean():.0f}", pos, self.small_font))
+
+        trend = summary['trend']
+        charts = (("Счёт", [[count] for count in summary['scores']],
+                   (self.BAR_COLOR,), f"0 - {history.SCORE_BINS[-1]}+"),
+                  ("Уровень", [[count] for count in summary['levels']],
+                   (self.BAR_COLOR,), f"1 - {history.LEVEL_BINS[-1]}+"),
+                  (f"Смерти по {history.TREND} игр",
+                   [trend[i:i + 3] for i in range(0, len(trend), 3)],
+                   self.DEATH_COLORS, None))
+        for (i, chart) in enumerate(charts):
+            self.chart(self.width * (2 * i + 1) // 6 - self.CHART_W // 2,
+                       *chart)
+
+    def chart(self, left, title, bars, colors, caption):
+        """Столбчатая диаграмма, столбики bars из отрезков цветов colors"""
+        top, bottom = self.height // 3 + 30, self.height * 3 // 4
+        center = left + self.CHART_W // 2
+        self.history.append(self.label(title, (center, top - 40),
+                                       self.small_font))
+        highest = max(sum(bar) for bar in bars) or 1
+        width = self.CHART_W // len(bars)
+        for (i, bar) in enumerate(bars):
+            y = bottom
+            for (value, color) in zip(bar, colors):
+                h = (bottom - top) * value // highest
+                y -= h
+                self.bars.append((color, pygame.Rect(left + i * width + 2, y,
+                                                     width - 4, h)))
+        if caption is not None:
+            self.history.append(self.label(caption, (center, bottom + 5),
+                                           self.small_font))
+        else:
+            for (i, name) in enumerate(("сам", "удар", "энергия")):
+                self.history.append(self.label(
+                    name, (left + self.CHART_W * i // 3 + self.CHART_W // 6,
+                           bottom + 5), self.small_font, colors[i]))
 
-    def reset_stats(self):
+    async def reset_stats(self):
         ask_surf = self.screen.subsurface((self.width // 6,
                                            self.height // 6,
                                            self.width * 4 // 6,
@@ -710,7 +2114,7 @@ class Statistics:
                 if event.type == pygame.QUIT:
                     running = False
                 elif event.type == pygame.MOUSEBUTTONUP:
-                    pos = event.pos
+                    pos = screen_manager.scene_pos(event.pos, event=True)
                     pos = tuple(pos[i] + start[i] for i in range(2))
                     button = ask_buttons.get_button(pos)
                     if button is not None:
@@ -728,45 +2132,52 @@ class Statistics:
                     elif event.key == pygame.K_LEFT:
                         ask_buttons.move_focuse(-1)
 
-            pos = mouse.get_pos()
+            pos = screen_manager.scene_pos(mouse.get_pos())
             pos = tuple(pos[i] + start[i] for i in range(2))
             ask_buttons.update(pos)
             ask_surf.fill(pygame.color.Color('blueviolet'))
             for line in question:
                 render_text(ask_surf, *line, self.med_font)
             ask_buttons.render(ask_surf)
-            display.flip()
-            clock.tick(self.fps)
+            screen_manager.present(self.screen)
+            await scheduler.frame(self.fps)
 
         if answer:
             StatisticsFile().reset()
+            RunHistory().reset()
             self.get_stats()
+            self.get_history()
 
     def render(self):
         self.fon.blit()
         self.buttons.render(self.screen)
-        for line in self.stats:
-            render_text(self.screen, *line, self.med_font)
-        display.flip()
+        if self.show_history:
+            self.screen.blits(self.history, doreturn=False)
+            for (color, rect) in self.bars:
+                self.screen.fill(color, rect)
+        else:
+            self.screen.blits(self.stats, doreturn=False)
+        screen_manager.present(self.screen)
 
-    def events(self, event):
+    async def events(self, event):
         if event.type == pygame.QUIT:
             return True
         elif event.type == pygame.MOUSEBUTTONUP:
-            return self.mouse_click(event.pos)
+            return await self.mouse_click(event.pos)
 
         elif event.type == pygame.KEYDOWN:
             if event.key == pygame.K_ESCAPE:
                 return True
             elif event.key == pygame.K_RETURN:
-                return self.act(self.buttons.focused)
+                return await self.act(self.buttons.focused)
 
-    def run(self):
+    async def run(self):
         running = True
         arrow_pressed = [False, False, False, False]  # Up, Down, Right, Left
         while running:
             for event in pygame.event.get():
-                if self.events(event):
+                event = screen_manager.scene_event(event)
+                if await self.events(event):
                     running = False
                 if event.type == pygame.KEYDOWN:
                     if event.key in ARROWS:
@@ -775,31 +2186,33 @@ class Statistics:
                     if event.key in ARROWS:
                         arrow_pressed[ARROWS.index(event.key)] = False
                         
-            self.buttons.update(mouse.get_pos(), arrow_pressed)
+            self.buttons.update(screen_manager.scene_pos(mouse.get_pos()),
+                                arrow_pressed)
             self.render()
-            clock.tick(self.fps)
-        display.quit()
+            await scheduler.frame(self.fps)
 
-    def act(self, button):
+    async def act(self, button):
         """Возвращает bool -> надо ли завершать"""
         self.buttons.choose(*button)
         if button[0] == 0:
             return True
         elif button[0] == 1:
-            self.reset_stats()
+            await self.reset_stats()
+        elif button[0] == 2:
+            self.show_history = not self.show_history
         return False
 
-    def mouse_click(self, pos):
+    async def mouse_click(self, pos):
         res = self.buttons.get_button(pos)
         if res is None:
             return False
-        return self.act(res)
+        return await self.act(res)
 
 
 class StartScreen:  
     """
     Главный экран, создаёт 4 кнопки для перемещения между остальными экранами.
-    Создаётся независимо от других окон, перехватывая экран.
+    Рисует в своей поверхности, окно общее (DisplayManager).
     """
     FONT_NAME = os.path.join('data', 'mr_AfronikG.ttf')
     BUTTONS_TEXT = ["Старт", "Настройки", "Статистика", "Выход"]
@@ -807,106 +2220,114 @@ class StartScreen:
 
     def __init__(self):
         bgmus_play('menu')
-        self.screen = display.set_mode(self.SIZE)
-        display.set_caption("A Steroid Shower")
+        self.screen = screen_manager.scene(self.SIZE, "A Steroid Shower")
         self.fon = Fon(self)
-        self.fps = 25
+        self.fps = int(setter.get('menu_fps'))
         
 
         self.title = ("A Steroid Shower", (self.width // 2, 30),
-                      pygame.font.Font(self.FONT_NAME, 60),
+                      get_font(self.FONT_NAME, 60),
                       pygame.color.Color('yellow'))
         h_inc = render_text(self.screen, *self.title)
 
         self.buttons = ButtonTable(self.BUTTONS_TEXT,
                                    [self.width // 2, 30 + h_inc + 40],
-                                   pygame.font.Font(self.FONT_NAME, 55), 30)
-        self.run()
+                                   get_font(self.FONT_NAME, 55), 30)
 
     def render(self):
         self.fon.blit()
-        render_text(self.screen, *self.title)
+        render_text(self.screen, *self.title, static=True)
         self.buttons.render(self.screen)
-        display.flip()
+        screen_manager.present(self.screen)
 
-    def statistics(self):
-        Statistics()
-        self.screen = display.set_mode(self.SIZE)
+    async def statistics(self):
+        await Statistics().run()
+        self.screen = screen_manager.scene(self.SIZE, "A Steroid Shower")
 
-    def settings(self):
-        Settings()
-        self.screen = display.set_mode(self.SIZE)
+    async def settings(self):
+        await Settings().run()
+        self.screen = screen_manager.scene(self.SIZE, "A Steroid Shower")
 
-    def events(self, event):
+    async def events(self, event):
         if event.type == pygame.QUIT:
             raise Quit
         if event.type == pygame.MOUSEBUTTONUP:
-            if self.mouse_click(event.pos):
+            if await self.mouse_click(event.pos):
                 return True
         if event.type == pygame.KEYDOWN:
             if event.key == pygame.K_RETURN:
-                if self.act(self.buttons.focused):
+                if await self.act(self.buttons.focused):
                     return True
             elif event.key == pygame.K_UP:
                 self.buttons.move_focuse(-1)
             elif event.key == pygame.K_DOWN:
                 self.buttons.move_focuse(1)
 
-    def run(self):
+    async def run(self):
         running = True
         while running:
             for event in pygame.event.get():
-                if self.events(event):
+                if await self.events(screen_manager.scene_event(event)):
                     running = False
 
             if mouse.get_focused():
-                self.buttons.update(mouse.get_pos())
+                self.buttons.update(screen_manager.scene_pos(mouse.get_pos()))
+            music.update()
 
             self.render()
-            clock.tick(self.fps)
-        display.quit()
+            await scheduler.frame(self.fps)
 
-    def act(self, button):
+    async def act(self, button):
         """Возвращает bool -> надо ли завершать"""
         if button == 0:
             return True
         if button == 1:
-            self.settings()
+            await self.settings()
             return False
         if button == 2:
-            self.statistics()
+            await self.statistics()
             return False
         if button == 3:
             raise Quit
 
-    def mouse_click(self, pos):
+    async def mouse_click(self, pos):
         res = self.buttons.get_button(pos)
         if res is None:
             return False
-        return self.act(res)
+        return await self.act(res)
 
 
 class Rocket(pygame.sprite.Sprite):  
     """
     Ракета, управляемая пользователем стрелочками.
     Движение равномерное, моментальная смена вектора скорости,
-    независимое движение по осям.
+    независимое движение по осям. Место хранится с дробной частью
+    (остатки carry_x, carry_y), в rect - округлённое, поэтому скорость
+    в пикселях в секунду не зависит от частоты кадров.
     При движении влево или вправо спрайт поворачивается соответственно.
     Теряет 10 энергии в секунду, при обнулении уничтожается, изначально 100 единиц.
     При сборе осколка пополняет энергию, при столкновении с астероидом
     уничтожается; оба пересечения задействуют уменьшенный вдвое спрайт
     (более точно отображает его форму, чем полный размер)
+    и проверяются по всему пути за кадр (sweep), а не только в его конце,
+    чтобы на больших скоростях ракета не проскакивала сквозь астероиды.
     """
+    _layer = RenderGraph.ROCKET
 
     def __init__(self, game, *groups):
         self.game = game
         super().__init__(*groups)
         self.IMAGE = self.game.spr_images["rocket"]
         self.image = self.IMAGE  # картинка будет поворачиваться
+        # повороты считаются один раз, а не каждый кадр
+        self.IMAGES = {r: pygame.transform.rotate(self.IMAGE, 45 * r)
+                       for r in (-1, 1)}
+        self.IMAGES[0] = self.IMAGE
 
         self.rect = self.image.get_rect()
         self.rect.x = self.game.width // 2
         self.rect.y = self.game.height // 2
+        self.carry_x = self.carry_y = 0.
         self.v = 500 / self.game.fps
         self.fuel_loss = 10 / self.game.fps
 
@@ -922,46 +2343,71 @@ class Rocket(pygame.sprite.Sprite):
         self.rotate(0)
         if not args:
             return None
+        x0, y0 = self.rect.topleft
         if type(args[0]) == list:
             self.drive(args[0])
         self.fuel = max(0, self.fuel - self.fuel_loss)
+        move = (self.rect.x - x0, self.rect.y - y0)
 
         # Уменьшение для лучшего соответствия размерам спрайта
         self.rect.inflate_ip(-self.rect.w // 2, -self.rect.h // 2)
-        if pygame.sprite.spritecollideany(self, self.game.crash_sprites):
+        if self.sweep_collide(self.game.crash_sprites, move,
+                              self.game.asteroids.v):
             self.destroyed = 1
-        for grab in pygame.sprite.spritecollide(self,
-                                                self.game.picked_sprites,
-                                                False):
+        for grab in self.sweep_collide(self.game.picked_sprites, move):
             self.collect(grab)
         self.rect.inflate_ip(self.rect.w, self.rect.h)
 
         if self.fuel <= 0:
             self.destroyed = 2
 
+    def sweep_collide(self, group, move, fall=0):
+        """
+        Спрайты группы, которых ракета коснулась за кадр, сдвинувшись
+        на move, пока они опустились на fall
+        """
+        sprites = group.sprites()
+        if not sprites:
+            return []
+        bx, by, bw, bh = np.array([tuple(sprite.rect) for sprite in sprites]).T
+        toi = sweep(*self.rect, *move, bx, by, bw, bh, 0, fall)
+        return [sprite for (sprite, t) in zip(sprites, toi) if t <= 1]
+
     def drive(self, arrows):
+        dx = dy = 0
         if arrows[0]:
-            self.rect.y -= self.v
+            dy = -self.v
         elif arrows[1]:
-            self.rect.y += self.v
+            dy = self.v
         if arrows[2]:
-            self.rect.x += self.v
+            dx = self.v
             self.rotate(-1)
         elif arrows[3]:
-            self.rect.x -= self.v
+            dx = -self.v
             self.rotate(1)
+        self.move(dx, dy)
+
+    def move(self, dx, dy):
+        """Сдвиг на дробные dx, dy: в rect - целая часть, остаток копится"""
+        self.carry_x += dx
+        self.carry_y += dy
+        step_x = round(self.carry_x)
+        step_y = round(self.carry_y)
+        self.carry_x -= step_x
+        self.carry_y -= step_y
+        self.rect.move_ip(step_x, step_y)
 
     def rotate(self, r):
-        if r != 0:
-            self.image = pygame.transform.rotate(self.image, 45 * r)
-        else:
-            self.image = self.IMAGE
+        self.image = self.IMAGES[r]
 
 
 class StatusBar:
     """
     Выводит информацию о количестве энергии у ракеты и
     уровне, соответствующему количеству собранных осколков энергии.
+    Надписи рендерятся заново (render) и слой текста в RenderGraph
+    собирается заново только при смене значений; в общий кэш static_text
+    они не попадают - значений много и каждое нужно недолго.
     """
     POINTS = ['Уровень', 'Энергия']
 
@@ -970,23 +2416,32 @@ class StatusBar:
         self.values = ['1', '100']
         self.x = 20
         self.y = 30
-        shift = self.game.SMALL_FONT.render('Уровень: 1', True,
-                                            self.game.WHITE).get_rect()
+        shift = pygame.Rect((0, 0), self.game.SMALL_FONT.size('Уровень: 1'))
         self.x += shift.w // 2
         self.shift = shift.h
+        self.render()
 
     def update(self, *args):
-        self.values[0] = str(round(self.game.level))
-        self.values[1] = str(round(self.game.rocket.fuel))
+        values = [str(round(self.game.level)),
+                  str(round(self.game.rocket.fuel))]
+        if values != self.values:
+            self.values = values
+            self.render()
+            self.game.graph.changed(RenderGraph.HUD)
 
     def render(self):
+        self.pairs = []
         shift = 0
         for line in zip(self.POINTS, self.values):
-            render_text(self.game.screen, ': '.join(line),
-                        (self.x, self.y + shift),
-                        self.game.SMALL_FONT, self.game.WHITE)
+            text = self.game.SMALL_FONT.render(': '.join(line), True,
+                                               self.game.WHITE)
+            self.pairs.append((text, text.get_rect(
+                midtop=(self.x, self.y + shift)).topleft))
             shift += self.shift
 
+    def blits(self):
+        return self.pairs
+
 
 class AnimatedSprite(pygame.sprite.Sprite):
     """
@@ -1027,34 +2482,71 @@ class EnergyShatters(AnimatedSprite):
     """
     Осколки энергии, имеют ценность 40 единиц
     По сути реализованы в виде одного спрайта,
-    перемещающегося при его сборе (пересечение с ракетой) в случайное место
-    на следующем геометрическом уровне (задаётся в классе игры),
-    после чего у игры обновляется уровень
+    перемещающегося при его сборе (пересечение с ракетой) на место осколка
+    следующего куска мира (World), после чего у игры обновляется уровень:
+    осколок уровня level лежит в куске level - 1
     """
+    _layer = RenderGraph.SHARD
 
     def __init__(self, game, *groups):
         self.game = game
         super().__init__(self.game.spr_images["energy"], 6, 4,
-                         randint(0, self.game.width + 50),
-                         randint(-self.game.LEVEL_H + 50, 0),
+                         *self.game.world.shard(0),
                          self.game.fps / 24, *groups)
         self.profit = "F40"
-        self.y0 = self.rect.y + self.game.LEVEL_H
 
     def collect(self):
         self.game.levelup()
-        self.rect.x = randint(0, self.game.width + 50)
-        level = self.rect.y - self.y0 - self.game.LEVEL_H
-        self.rect.y = randint(level + 50, level + self.game.LEVEL_H - 50)
-        self.y0 = self.rect.y - level
+        self.rect.topleft = self.game.world.shard(self.game.level - 1)
+
+
+class LevelCurve:
+    """
+    Кривая сложности: множители параметров астероидов по уровню.
+    rates считает их векторно для массива уровней, lookup берёт
+    из таблицы, посчитанной один раз на уровни 1..LEVELS (выше - расчётом).
+    Asteroids.level_up и пакетный симулятор читают их отсюда:
+    n = int(density * ширина / 250), t0 = fps / period,
+    v = speed * 80 / fps. Первый уровень - начальные значения игры.
+    """
+    LEVELS = 500
+    table = None
+
+    @staticmethod
+    def rates(levels):
+        """(density, period, speed) - массивы для массива уровней levels"""
+        x = np.asarray(levels)
+        f = x.astype(float)
+        a = 0.33
+        b = 14
+        density = f ** 0.6 - (2.5 * x // 10) ** 0.5
+        period = 2 * f ** 0.7
+        low = (f ** 0.6 + 0.16 * 2 ** (a * ((f / 5) + b))
+               - 0.19 * 2 ** (a * ((x // 5) + b)))
+        high = np.abs(f - 50) ** 0.9
+        speed = np.where(x == 1, 1., np.where(x < 50, low, high))
+        return density, period, speed
+
+    @classmethod
+    def lookup(cls, levels):
+        """То же, что rates, но из таблицы"""
+        if cls.table is None:
+            cls.table = np.column_stack(cls.rates(np.arange(1, cls.LEVELS + 1)))
+        levels = np.asarray(levels)
+        if levels.max(initial=0) > cls.LEVELS:
+            return cls.rates(levels)
+        rows = cls.table[levels - 1]
+        return rows[..., 0], rows[..., 1], rows[..., 2]
 
 
 class Asteroids:
     """
-    Класс управляет всеми астероидами. У всех одинаковая скорость.
+    Класс управляет всеми астероидами. У всех одинаковая скорость,
+    дробная часть пути копится у каждого в carry, как у ракеты.
     Генерация новых происходит не быстрее периода и
-    ограничивается сверху концентрацией астероидов.
-    Все три параметра усложняются с каждым уровнем.
+    ограничивается сверху концентрацией астероидов;
+    место появления над экраном берётся из куска мира (World.spawn).
+    Все три параметра усложняются с каждым уровнем (LevelCurve).
     """
 
     def __init__(self, game, *groups):
@@ -1063,23 +2555,29 @@ class Asteroids:
         self.image = self.game.spr_images["asteroid"]
         self.IMAGE_H = self.image.get_height()
         self.asteroids = []
-        self.v = 80 / self.game.fps
-        self.n = self.game.width // 250
-        self.t0 = self.game.fps / 2
+        self.level_up(1)
         self.i = 0
 
-    def gen_particle(self):
-        new_ast = pygame.sprite.Sprite(*self.groups)
+    def add(self, x, y):
+        new_ast = pygame.sprite.Sprite()
+        new_ast._layer = RenderGraph.ASTEROIDS
         new_ast.image = self.image
-        new_ast.rect = new_ast.image.get_rect()
-        new_ast.rect.move_ip(randint(0, self.game.width),
-                             -self.IMAGE_H - randint(0, 200))
+        new_ast.rect = new_ast.image.get_rect(topleft=(x, y))
+        new_ast.carry = 0.
+        new_ast.add(*self.groups)
         self.asteroids.append(new_ast)
 
+    def gen_particle(self):
+        x, above = self.game.world.spawn()
+        self.add(x, -self.IMAGE_H - above)
+
     def update(self):
         self.i += 1
-        for ast in self.asteroids:
-            ast.rect.y += self.v
+        for ast in self.asteroids[:]:  # копия: из списка удаляем на ходу
+            ast.carry += self.v
+            step = round(ast.carry)
+            ast.carry -= step
+            ast.rect.y += step
             if ast.rect.y > self.game.height:
                 ast.kill()
                 self.asteroids.remove(ast)
@@ -1087,19 +2585,371 @@ class Asteroids:
             self.i = 0
             self.gen_particle()
 
-    def calculate_velocity_rate(self, level):
-        x = level
-        a = 0.33
-        b = 14
-        if level < 50:
-            return x ** 0.6 + 0.16 * 2 ** (a * ((x / 5) + b)) - 0.19 * 2 ** (a * ((x // 5) + b))
+    def level_up(self, level):
+        density, period, speed = map(float, LevelCurve.lookup(level))
+        self.n = int(density * self.game.width / 250)
+        self.t0 = self.game.fps / period
+        self.v = speed * 80 / self.game.fps
+
+
+class WorldChunk:
+    """
+    Кусок мира: свой генератор, место осколка (x, отступ от верха куска)
+    и запас мест появления астероидов (x, насколько выше экрана)
+    """
+
+    def __init__(self, rng, shard):
+        self.rng = rng
+        self.shard = shard
+        self.spawns = deque()
+
+
+class World:
+    """
+    Мир игры по кускам - полосам высотой level_h: кусок 0 - первая полоса
+    над стартом, дальше вверх 1, 2... (вниз - отрицательные).
+    Всё случайное в куске берётся из своего Random от (seed, номер куска):
+    место осколка и поток мест появления астероидов, пока верх экрана
+    в этом куске; поэтому мир одинаков при одном seed, как бы ни летать.
+    rect - начало мира в координатах экрана, его двигает камера, как спрайт.
+    prepare вызывается в запасе времени кадра: готовит куски на AHEAD
+    вперёд (по одному за кадр) и выбрасывает пройденные (дальше BEHIND),
+    так что в памяти лишь несколько кусков, а кадры с частым появлением
+    астероидов только берут готовые места.
+    """
+    AHEAD = 2
+    BEHIND = 1
+    BLOCK = 128  # мест появления астероидов готовится за раз
+
+    def __init__(self, seed, width, level_h):
+        self.seed = seed
+        self.width = width
+        self.level_h = level_h
+        self.rect = pygame.Rect(0, 0, 0, 0)
+        self.chunks = {}
+        self.current = 0
+
+    def generate(self, index):
+        rng = Random(f"{self.seed}/{index}")
+        chunk = self.chunks[index] = WorldChunk(
+            rng, (rng.randint(0, self.width + 50),
+                  rng.randint(50, self.level_h - 50)))
+        self.extend(chunk)
+        return chunk
+
+    def extend(self, chunk):
+        rng = chunk.rng
+        chunk.spawns.extend((rng.randint(0, self.width), rng.randint(0, 200))
+                            for _ in range(self.BLOCK))
+
+    def chunk(self, index):
+        chunk = self.chunks.get(index)
+        if chunk is None:
+            chunk = self.generate(index)
+        return chunk
+
+    def shard(self, index):
+        """Место осколка куска index на экране"""
+        x, y = self.chunk(index).shard
+        return ((x + self.rect.x) % (self.width + 50),
+                self.rect.y - (index + 1) * self.level_h + y)
+
+    def spawn(self):
+        """Следующее место появления астероида из куска у верха экрана"""
+        chunk = self.chunk(self.rect.y // self.level_h)
+        if not chunk.spawns:
+            self.extend(chunk)
+        return chunk.spawns.popleft()
+
+    def prepare(self):
+        """Возвращает bool -> пришлось ли готовить кусок"""
+        self.current = self.rect.y // self.level_h
+        for index in [index for index in self.chunks
+                      if not -self.BEHIND <= index - self.current <= self.AHEAD]:
+            del self.chunks[index]
+        for index in range(self.current, self.current + self.AHEAD + 1):
+            chunk = self.chunks.get(index)
+            if chunk is None:
+                self.generate(index)
+                return True
+            if len(chunk.spawns) < self.BLOCK // 2:
+                self.extend(chunk)
+                return True
+        return False
+
+
+class FrameScheduler:
+    """
+    Общий цикл кадров всех экранов на asyncio (run). Экраны - корутины,
+    которые в конце каждого кадра ждут frame(fps): остаток времени кадра
+    без запаса MARGIN отдаётся фоновым задачам (spawn) - запись статистики
+    и игры, догрузка музыки и картинок, - а точный срок кадра выдерживает
+    clock.tick (FramePacer). Фоновые задачи - корутины, уступающие после
+    каждой небольшой порции работы; вызовы дольше кадра (декодирование
+    музыки, сжатие PNG) они отдают в поток через run_in_executor и ждут.
+    Время шагов каждой задачи копится в times ('экраны' - без ожидания
+    кадра), report выводит его на кадр.
+    С idle=False простой кадра не ждётся: для прогонов без окна, где
+    часы не ждут, фоновые задачи получают один проход за кадр.
+    """
+    MARGIN = 0.003
+    SCREENS = 'экраны'
+
+    def __init__(self, idle=True):
+        self.idle = idle
+        self.times = {}
+        self.frames = 0
+        self.last = perf_counter()
+
+    def add_time(self, name, seconds):
+        self.times[name] = self.times.get(name, 0) + seconds
+
+    @types.coroutine
+    def timed(self, name, coro):
+        """Ведёт корутину coro, считая время каждого её шага"""
+        value = error = None
+        while True:
+            start = perf_counter()
+            try:
+                if error is None:
+                    future = coro.send(value)
+                else:
+                    future = coro.throw(error)
+            except StopIteration as stop:
+                return stop.value
+            finally:
+                self.add_time(name, perf_counter() - start)
+            value = error = None
+            try:
+                value = yield future
+            except BaseException as caught:
+                error = caught
+
+    async def task(self, name, coro):
+        return await self.timed(name, coro)
+
+    def spawn(self, name, coro):
+        return asyncio.get_running_loop().create_task(self.task(name, coro))
+
+    def run(self, coro):
+        """Главный цикл: экраны (coro) и фоновые задачи до конца coro"""
+        return asyncio.run(self.task(self.SCREENS, coro))
+
+    async def frame(self, framerate=0):
+        """Конец кадра экрана, возвращает интервал кадра в мс"""
+        if self.idle and framerate:
+            rest = self.last + 1 / framerate - self.MARGIN - perf_counter()
+            await asyncio.sleep(max(rest, 0))
         else:
-            return (x - 50) ** 0.9
+            await asyncio.sleep(0)
+        start = perf_counter()
+        interval = clock.tick(framerate)
+        self.last = perf_counter()
+        # ожидание срока идёт внутри шага экрана, но работой не считается
+        self.add_time(self.SCREENS, start - self.last)
+        self.add_time('ожидание кадра', self.last - start)
+        self.frames += 1
+        return interval
+
+    def report(self):
+        frames = max(self.frames, 1)
+        lines = [f"Задачи, кадров: {self.frames}"]
+        for (name, t) in self.times.items():
+            lines.append(f"{name:<24} {1000 * t / frames:10.3f} мс за кадр")
+        return '\n'.join(lines)
+
+
+class FramePacer:
+    """
+    Ограничитель частоты кадров на замену pygame.time.Clock (тот же tick).
+    Спит до срока кадра с запасом spin и добирает остаток короткими
+    уступками потока (как tick_busy_loop), поэтому не опаздывает на
+    несколько миллисекунд, как простой sleep. Запас подстраивается под
+    замеченное опоздание sleep (SPIN..MAX_SPIN).
+    Срок кадра отсчитывается от прошлого срока, а не от конца ожидания,
+    так что средняя частота точная; при опоздании больше чем на кадр
+    отсчёт начинается заново. tick(0) не ждёт (режим без ограничения).
+    Возвращает время с прошлого tick в миллисекундах.
+    """
+    SPIN = 0.002
+    MAX_SPIN = 0.02
 
-    def level_up(self, level):
-        self.n = int((level ** 0.6 - (2.5 * level // 10) ** 0.5) * self.game.width / 250)
-        self.t0 = self.game.fps / (2 * level ** 0.7)
-        self.v = self.calculate_velocity_rate(level) * 80 / self.game.fps
+    def __init__(self):
+        self.deadline = self.last = perf_counter()
+        self.spin = self.SPIN
+
+    def tick(self, framerate=0):
+        now = perf_counter()
+        if framerate:
+            period = 1 / framerate
+            self.deadline += period
+            if self.deadline < now - period:
+                self.deadline = now
+            rest = self.deadline - now - self.spin
+            if rest > 0:
+                sleep(rest)
+                late = perf_counter() - (now + rest)
+                if late > self.spin:
+                    self.spin = min(late * 1.25, self.MAX_SPIN)
+                else:
+                    self.spin = max(self.SPIN, self.spin * 0.99)
+            while perf_counter() < self.deadline:
+                sleep(0)
+        else:
+            self.deadline = now
+        now = perf_counter()
+        interval = now - self.last
+        self.last = now
+        return interval * 1000
+
+
+class FrameGovernor:
+    """
+    Следит за загрузкой кадра: временем работы (без ожидания clock.tick)
+    относительно длительности кадра 1/fps. Выдаёт долю share (MIN..1)
+    для необязательной работы (частиц): если загрузка выше HIGH,
+    доля уменьшается, если ниже LOW - понемногу растёт обратно.
+    """
+    LOW = 0.5
+    HIGH = 0.8
+    MIN = 0.05
+
+    def __init__(self, fps):
+        self.frame_time = 1 / fps
+        self.share = 1.0
+        self.start = perf_counter()
+
+    def work_done(self):
+        load = (perf_counter() - self.start) / self.frame_time
+        if load > self.HIGH:
+            self.share = max(self.MIN, self.share * 0.8)
+        elif load < self.LOW:
+            self.share = min(1.0, self.share + 0.02)
+
+    def restart(self):
+        self.start = perf_counter()
+
+
+class Particles:
+    """
+    Частицы (взрыв ракеты, сбор осколка, хвосты астероидов) в массивах
+    NumPy на CAPACITY штук, выделенных один раз: положение, скорость,
+    оставшаяся и полная жизнь, цвет. Движение, затухание скорости и камера
+    считаются разом для всех, рисуются они списком для общего blits кадра:
+    квадратики цветов PALETTE с FADE ступенями прозрачности по остатку жизни.
+    Одновременно живёт не больше budget частиц (его задаёт FrameGovernor),
+    лишние новые просто не появляются.
+    Скорости заданы в пикселях в секунду, жизнь - в секундах, DRAG - доля
+    скорости, остающаяся через секунду; на кадр они пересчитываются по fps,
+    так что разлёт и длительность от частоты кадров не зависят.
+    """
+    CAPACITY = 4096
+    FADE = 4
+    SIZE = 3
+    DRAG = 0.156
+    TRAIL_SPEED = 9
+    TRAIL_LIFE = (0.2, 0.5)
+    PALETTE = ('orange', 'yellow', 'red', 'white', 'cyan', 'darkorange')
+    EXPLOSION = (0, 1, 2, 3)
+    SHARD = (3, 4)
+    TRAIL = (0, 5)
+
+    def __init__(self, window, fps):
+        self.window = window
+        self.fps = fps
+        self.drag = self.DRAG ** (1 / fps)
+        self.x = np.zeros(self.CAPACITY, np.float32)
+        self.y = np.zeros(self.CAPACITY, np.float32)
+        self.vx = np.zeros(self.CAPACITY, np.float32)
+        self.vy = np.zeros(self.CAPACITY, np.float32)
+        self.life = np.zeros(self.CAPACITY, np.int16)
+        self.max_life = np.ones(self.CAPACITY, np.int16)
+        self.color = np.zeros(self.CAPACITY, np.uint8)
+        self.budget = self.CAPACITY
+        self.rng = np.random.default_rng()
+        # картинки по номеру цвет * FADE + ступень
+        self.images = []
+        for name in self.PALETTE:
+            for step in range(self.FADE):
+                image = pygame.Surface((self.SIZE, self.SIZE))
+                if display.get_surface() is not None:
+                    image = image.convert()
+                image.fill(pygame.color.Color(name))
+                image.set_alpha(255 * (step + 1) // self.FADE)
+                self.images.append(image)
+
+    def __len__(self):
+        return int(np.count_nonzero(self.life > 0))
+
+    def clear(self):
+        self.life[:] = 0
+
+    def emit(self, x, y, vx, vy, life, colors):
+        """Новые частицы (массивы одной длины), сколько позволяет budget"""
+        free = np.flatnonzero(self.life <= 0)
+        n = min(len(x), len(free), max(0, self.budget - (self.CAPACITY - len(free))))
+        if n <= 0:
+            return 0
+        slots = free[:n]
+        self.x[slots] = x[:n]
+        self.y[slots] = y[:n]
+        self.vx[slots] = vx[:n]
+        self.vy[slots] = vy[:n]
+        self.life[slots] = life[:n]
+        self.max_life[slots] = life[:n]
+        self.color[slots] = self.rng.choice(colors, n)
+        return n
+
+    def frames(self, seconds):
+        return max(1, round(seconds * self.fps))
+
+    def burst(self, center, colors, n, speed, life):
+        """n частиц из точки во все стороны: speed в пикс/с, life в с"""
+        angle = self.rng.uniform(0, 2 * np.pi, n)
+        v = self.rng.uniform(0.2, 1, n) * speed / self.fps
+        life = self.frames(life)
+        return self.emit(np.full(n, center[0]), np.full(n, center[1]),
+                         v * np.cos(angle), v * np.sin(angle),
+                         self.rng.integers(life // 2, life + 1, n), colors)
+
+    def trails(self, rects):
+        """По частице над каждым прямоугольником (падающим астероидом)"""
+        if not rects:
+            return 0
+        n = len(rects)
+        x, y, w, h = np.array([tuple(rect) for rect in rects], np.float32).T
+        speed = self.TRAIL_SPEED / self.fps
+        return self.emit(x + self.rng.uniform(0.3, 0.7, n) * w, y + h * 0.2,
+                         self.rng.uniform(-speed, speed, n), np.zeros(n),
+                         self.rng.integers(self.frames(self.TRAIL_LIFE[0]),
+                                           self.frames(self.TRAIL_LIFE[1]),
+                                           n), self.TRAIL)
+
+    def update(self):
+        self.x += self.vx
+        self.y += self.vy
+        self.vx *= self.drag
+        self.vy *= self.drag
+        np.subtract(self.life, 1, out=self.life, where=self.life > 0)
+
+    def apply_camera(self, camera):
+        """Как Camera.apply для спрайтов, сразу для всех частиц"""
+        self.x += camera.dx
+        self.x %= self.window.width + 50
+        self.y += camera.dy
+
+    def blits(self):
+        """Пары (картинка, место) живых частиц"""
+        alive = np.flatnonzero(self.life > 0)
+        if not len(alive):
+            return []
+        step = np.minimum(self.life[alive] * self.FADE // self.max_life[alive],
+                          self.FADE - 1)
+        index = self.color[alive] * self.FADE + step
+        images = self.images
+        return [(images[i], (x, y)) for (i, x, y) in
+                zip(index.tolist(), self.x[alive].astype(int).tolist(),
+                    self.y[alive].astype(int).tolist())]
 
 
 class Game:  
@@ -1109,42 +2959,86 @@ class Game:
     с пользоваетелем. Контролирует музыку и размер экрана,
     сверяясь с файлом  настроек. Все спрайты объединяюся в группы спрайтов
     по значению.
+    Если в настройках задан размер отрисовки, игра рисуется на поверхность
+    этого размера и растягивается на окно раз за кадр (SCALED в pygame 2,
+    иначе smoothscale), так что ни цена кадра, ни сложность (Asteroids.n)
+    не зависят от разрешения монитора.
+    С настройкой renderer = texture (запуск с ключом --texture) рисует
+    через TextureScreen, а при его недоступности - как обычно.
+    Окно общее со всеми экранами (DisplayManager) и после игры не закрывается.
     Объекты игры привязаны к объекту игры, обращаются к нему сами напрямую.
-    Во время игры перехватывает Restart и выключает экран,
+    Во время игры перехватывает Restart,
     но в главной функции вызывается снова до выброса Quit.
-    Реализует паузу в виде отдельного цикла,
+    Если на экране конца игры нажать R, игра начинается заново на месте
+    (reset): окно, картинки и шрифты остаются, пересоздаются только
+    ракета, астероиды, осколок, уровень, камера и время.
+    На каждом новом уровне состояние запоминается (GameState), и C на
+    экране конца игры повторяет игру с начала этого уровня; при закрытии
+    окна во время игры она сохраняется на диск и продолжается при
+    следующем запуске.
+    Игра, пауза, взрыв и конец игры - корутины с циклами кадров
+    общего FrameScheduler (play ведёт всю игру с повторами),
     также есть смена полноэкранного режима и самоуничтожение.
     После уничтожения подводит итог: тип смерти, уровень,
     скорость продвижения в пикселях в секунду и счёт
     (зависит от двух последних параметров и накопленной энергии),
     ждёт реакции пользователя и выбрасывает Restart.
     При движении камера перемещает всё в обратную сторону (относительное движение).
+    Кадр собирается по слоям RenderGraph, каждый спрайт - один раз.
+    Рисуются и анимируются только спрайты, видимые на экране:
+    астероиды над экраном, хвост цилиндра камеры и далёкий осколок
+    пропускаются (число нарисованных и отсечённых - в профиле).
+    Мир (World) у каждой игры свой, от случайного seed, и готовится
+    кусками заранее в запасе времени кадра.
+    Взрыв ракеты, сбор осколка и хвосты астероидов - частицы (Particles),
+    их число ограничивает FrameGovernor по загрузке кадра;
+    после гибели взрыв показывается EXPLOSION_TIME секунд.
+    С настройкой capture (ключи --capture и --capture-png) выведенные
+    кадры пишутся в фоне (Capture).
+    Частота кадров (fps) берётся из настроек, скорости в игре заданы
+    в секунду и делятся на неё. С pacing = uncapped (ключ --uncapped)
+    кадры игры идут без ожидания - для замеров; интервал между кадрами
+    и его разброс - в профиле.
+    С настройкой pipeline (ключ --pipeline) кадр идёт конвейером:
+    шаг мира (simulate) в своём потоке (Simulation) считает кадр N + 1,
+    пока главный поток рисует и выводит кадр N по снимку (snapshot),
+    так что кадр стоит не сумму, а большее из двух; ввод при этом
+    виден на кадр позже, поэтому по умолчанию кадр последовательный.
+    Каждый кадр попадает в самописец (FlightRecorder), при гибели
+    его запись сохраняется; последний кадр записи - момент гибели,
+    до сдвига камеры.
     """
     FONT_NAME = os.path.join('data', 'mr_AfronikG.ttf')
     WHITE = pygame.color.Color('white')
     LEVEL_H = 1600
+    MUSIC_LEVELS = 10  # каждые 10 уровней - следующая дорожка, если она есть
+    EXPLOSION_TIME = 0.8
     ARROWS = (pygame.K_UP, pygame.K_DOWN, pygame.K_RIGHT, pygame.K_LEFT)
+    # Во время игры очередь событий пропускает только эти
+    ALLOWED_EVENTS = (pygame.QUIT, pygame.KEYDOWN, pygame.KEYUP,
+                      pygame.MOUSEBUTTONUP)
 
     def set_params(self):
-        size = tuple(int(x) for x in setter.get('size').split('x'))
-        self.screen = display.set_mode(size)
-        if size == (0, 0):
-            self.sure_fullscreen()
-        self.size = (self.width, self.height) = self.screen.get_size()
-
-    def sure_fullscreen(self):
-        full = display.toggle_fullscreen()
-        if not full:
-            display.toggle_fullscreen()
+        screen_manager.apply()
+        screen_manager.caption("A Steroid Shower")
+        self.screen = screen_manager.screen
+        self.size = (self.width, self.height) = screen_manager.size
 
     def __init__(self):
         self.set_params()
-        display.set_caption("A Steroid Shower")
-
-        self.BIG_FONT = pygame.font.Font(self.FONT_NAME, 45)
-        self.SMALL_FONT = pygame.font.Font(self.FONT_NAME, 32)
 
-        self.fps = 30
+        self.BIG_FONT = get_font(self.FONT_NAME, 45)
+        self.SMALL_FONT = get_font(self.FONT_NAME, 32)
+        # надпись паузы готовится заранее, а не на каждой паузе
+        self.PAUSE_TEXT = static_text('Пауза', get_font(self.FONT_NAME, 400),
+                                      self.WHITE)
+
+        self.fps = int(setter.get('fps'))
+        if screen_manager.refresh is not None:
+            # с vsync кадров не больше, чем у монитора: шаг мира на кадр
+            # считается по fps, иначе игра шла бы замедленно
+            self.fps = min(self.fps, screen_manager.refresh)
+        self.limit = 0 if setter.get('pacing') == 'uncapped' else self.fps
         self.spr_images = {"energy": load_image("energy.png", -1),
                            "rocket": load_image("rocket.png"),
                            "asteroid": load_image("asteroid.png")}
@@ -1152,93 +3046,261 @@ class Game:
         self.fon = Fon(self)
         self.fon.blit()
 
-        self.all_sprites = pygame.sprite.Group()
+        self.latency = None
+        if int(setter.get('latency')):
+            self.latency = InputLatency()
+        self.profiler = Profiler(int(setter.get('allocations')))
+        self.recorder = FlightRecorder(self.fps)
+        self.particles = Particles(self, self.fps)
+        self.governor = FrameGovernor(self.fps)
+        self.simulation = None
+        if int(setter.get('pipeline')):
+            self.simulation = Simulation(self)
+        self.capture = None
+        if setter.get('capture') != '0':
+            if isinstance(self.screen, TextureScreen):
+                print("Запись игры при отрисовке через текстуры недоступна")
+            else:
+                self.capture = Capture(self.screen, self.fps,
+                                       setter.get('capture'))
+        pygame.event.set_blocked(None)
+        pygame.event.set_allowed(self.ALLOWED_EVENTS)
+        self.replay = True
+        self.restart_time = None
+        self.resume = None
+        if os.path.exists(GameState.SUSPEND):
+            with open(GameState.SUSPEND, 'rb') as f:
+                self.resume = f.read()
+            os.remove(GameState.SUSPEND)
+
+    @classmethod
+    async def preload(cls):
+        """Фоновая задача: картинки и шрифты игры - заранее, пока меню"""
+        for (name, colorkey) in (("energy.png", -1), ("rocket.png", None),
+                                 ("asteroid.png", None)):
+            load_image(name, colorkey)
+            await asyncio.sleep(0)
+        for size in (45, 32):
+            get_font(cls.FONT_NAME, size)
+            await asyncio.sleep(0)
+        static_text('Пауза', get_font(cls.FONT_NAME, 400), cls.WHITE)
+
+    async def play(self):
+        try:
+            while self.replay:
+                self.replay = False
+                self.reset()
+                try:
+                    await self.run()
+                except Restart:
+                    pass
+        except Quit:
+            if self.rocket.alive():
+                with open(GameState.SUSPEND, 'wb') as f:
+                    f.write(GameState.dump(self))
+            raise
+        finally:
+            if self.latency is not None:
+                print(self.latency.report())
+            if int(setter.get('profile')) or self.profiler.allocations:
+                print(self.profiler.report())
+            self.profiler.close()
+            if self.simulation is not None:
+                self.simulation.close()
+            if self.capture is not None:
+                print(self.capture.close())
+        pygame.event.set_allowed(None)
+
+    def reset(self):
+        """Начинает новую игру на уже открытом окне"""
+        self.all_sprites = pygame.sprite.LayeredUpdates()
         self.picked_sprites = pygame.sprite.Group()
         self.crash_sprites = pygame.sprite.Group()
         self.player_group = pygame.sprite.Group()
 
         self.level = 1
+        self.seed = getrandbits(32)
+        self.world = World(self.seed, self.width, self.LEVEL_H)
         self.rocket = Rocket(self, self.all_sprites, self.player_group)
         self.energy_shatters = EnergyShatters(self, self.all_sprites,
                                               self.picked_sprites)
         self.asteroids = Asteroids(self, self.all_sprites,
                                    self.crash_sprites)
         self.stat_bar = StatusBar(self)
+        self.graph = RenderGraph(self)
+        self.graph.cache(RenderGraph.HUD)
         self.camera = Camera(self)
-        try:
-            self.run()
-        except Restart:
-            display.quit()
-
-    def events(self, event):
+        self.fon.rect.topleft = (0, 0)
+        self.recorder.reset()
+        self.particles.clear()
+        self.arrow_pressed = [False, False, False, False]
+        self.checkpoint = None
+        self.checkpoint_level = 0
+
+    async def events(self, event):
         if event.type == pygame.QUIT:
             raise Quit
         if event.type == pygame.KEYDOWN:
             if event.key == pygame.K_p:
-                self.pause()
+                await self.pause()
             if event.key == pygame.K_f:
-                display.toggle_fullscreen()
+                screen_manager.toggle_fullscreen()
             elif event.key == pygame.K_r:
-                self.destroy(0)
+                await self.destroy(0)
             # Случай непредвиденного самоуничтожения клавишей R
         elif event.type == pygame.MOUSEBUTTONUP:
             if sum(mouse.get_pressed()) >= 1:
                 # или 2-мя любыми кнопками мыши
-                self.destroy(0)
+                await self.destroy(0)
             else:
-                display.toggle_fullscreen()
+                screen_manager.toggle_fullscreen()
 
 
-    def blit(self):
-        self.fon.blit()
-        self.all_sprites.draw(self.screen)
-        self.player_group.draw(self.screen)
-        self.stat_bar.render()
+    def visible(self, group):
+        """Спрайты группы (или списка), пересекающие экран"""
+        sprites = list(group)
+        view = pygame.Rect((0, 0), self.size)
+        return [sprites[i] for i in
+                view.collidelistall([sprite.rect for sprite in sprites])]
 
-    def run(self):
-        running = True
-        bgmus_play()
-        self.START_TIME = time() % (60 * 60 * 24 * 30)
-        arrow_pressed = [False, False, False, False]  # Up, Down, Right, Left
-        while running:
-            for event in pygame.event.get():
-                self.events(event)
-                if event.type == pygame.KEYDOWN:
-                    if event.key in ARROWS:
-                        arrow_pressed[ARROWS.index(event.key)] = True  
-                if event.type == pygame.KEYUP:
-                    if event.key in ARROWS:
-                        arrow_pressed[ARROWS.index(event.key)] = False
-            
-            
-            self.all_sprites.update()
-            self.player_group.update(arrow_pressed)
-            self.asteroids.update()
-            if self.rocket.destroyed:
-                self.destroy(self.rocket.destroyed)
-
-            self.camera.update(self.rocket)
-            self.camera.apply_fon(self.fon)
-            for sprite in self.all_sprites:
-                self.camera.apply(sprite)
-
-            self.stat_bar.update()
-            self.fon.update()
-
-            self.blit()
-            display.flip()
-            clock.tick(self.fps)
+    def visible_blits(self, group):
+        """Пары (картинка, место) для видимых спрайтов группы (или списка)"""
+        visible = self.visible(group)
+        self.profiler.count('нарисовано', len(visible))
+        self.profiler.count('отсечено', len(group) - len(visible))
+        return [(sprite.image, sprite.rect.topleft) for sprite in visible]
 
-    def pause(self):
+    def snapshot(self):
+        """
+        Кадр, который не меняется дальнейшими шагами мира:
+        пары (картинка, место) всех слоёв (RenderGraph) для blits
+        """
+        return self.graph.frame()
+
+    def blit(self, snapshot=None):
+        """Весь кадр уходит на экран одним вызовом blits"""
+        if snapshot is None:
+            snapshot = self.snapshot()
+        self.screen.blits(snapshot, doreturn=False)
+
+    def flip(self):
+        screen_manager.flip()
+        if self.capture is not None:
+            self.capture.frame()
+
+    def show(self, snapshot):
+        self.blit(snapshot)
+        self.profiler.phase('отрисовка')
+        self.flip()
+        if self.latency is not None:
+            self.latency.frame_shown()
+        if self.restart_time is not None:
+            self.profiler.sample('перезапуск',
+                                 perf_counter() - self.restart_time)
+            self.restart_time = None
+        self.profiler.phase('вывод')
+
+    async def run(self):
+        self.START_TIME = time() % (60 * 60 * 24 * 30)
+        if self.resume is not None:
+            try:
+                GameState.restore(self, self.resume)
+            except ValueError as error:
+                print("Игра не восстановлена:", error)
+            self.resume = None
+        bgmus_play(str(self.level // self.MUSIC_LEVELS))
+        self.profiler.skip()
+        snapshot = self.snapshot()
+        while True:
+            events = pygame.event.get()
+            if self.latency is not None:
+                self.latency.polled()
+            for event in events:
+                await self.events(event)
+                if (self.latency is not None and event.type in
+                        (pygame.KEYDOWN, pygame.KEYUP) and event.key in ARROWS):
+                    self.latency.key_event(event)
+            music.update()
+            self.profiler.phase('события')
+
+            # Стрелки опрашиваются как можно позже, прямо перед шагом мира
+            pressed = pygame.key.get_pressed()
+            self.arrow_pressed = [pressed[key] for key in ARROWS]  # Up, Down, Right, Left
+            if self.simulation is None:
+                death, snapshot = self.simulate(self.arrow_pressed)
+                if self.latency is not None:
+                    self.latency.step_taken()
+                if death:
+                    await self.destroy(death)
+                self.show(snapshot)
+            else:
+                self.simulation.step(self.arrow_pressed)
+                self.show(snapshot)
+                death, snapshot = self.simulation.result()
+                if self.latency is not None:
+                    self.latency.step_taken()
+                self.profiler.phase('ожидание шага')
+                if death:
+                    await self.destroy(death)
+
+            self.profiler.frame()
+            self.governor.work_done()
+            interval = await scheduler.frame(self.limit)
+            self.governor.restart()
+            self.profiler.sample('интервал кадра', interval / 1000)
+            self.profiler.phase('ожидание')
+
+    def simulate(self, arrows):
+        """
+        Шаг мира на кадр: анимация, ракета, астероиды, частицы, камера,
+        запись, подготовка кусков мира.
+        Возвращает тип смерти ракеты (0 - жива) и снимок кадра
+        """
+        for sprite in self.visible(self.all_sprites):
+            sprite.update()  # анимация нужна только видимым
+        self.player_group.update(arrows)
+        self.asteroids.update()
+        if self.rocket.destroyed:
+            return self.rocket.destroyed, None
+        self.profiler.phase('обновление')
+
+        self.particles.budget = int(self.governor.share *
+                                    self.particles.CAPACITY)
+        self.particles.trails([sprite.rect for sprite in
+                               self.visible(self.crash_sprites)])
+        self.particles.update()
+        self.profiler.count('частиц', len(self.particles))
+        self.profiler.phase('частицы')
+
+        self.camera.update(self.rocket)
+        self.camera.apply_fon(self.fon)
+        for sprite in self.all_sprites:
+            self.camera.apply(sprite)
+        self.camera.apply(self.world)
+        self.particles.apply_camera(self.camera)
+
+        self.stat_bar.update()
+        self.fon.update()
+        self.profiler.phase('камера')
+
+        self.recorder.record(self, arrows)
+        if self.checkpoint_level != self.level:
+            self.checkpoint = GameState.dump(self)
+            self.checkpoint_level = self.level
+        self.profiler.phase('запись')
+
+        self.profiler.count('кусков мира', self.world.prepare())
+        snapshot = self.snapshot()
+        self.profiler.phase('мир и снимок')
+        return 0, snapshot
+
+    async def pause(self):
         start_time = time() % (60 * 60 * 24 * 30)
         self.blit()
-        font = pygame.font.Font(self.FONT_NAME, 400)
-        render_text(self.screen, 'Пауза',
-                    (self.width // 2,
-                     (self.height -
-                      font.render('Пауза', True, (0, 0, 0)).get_rect().h) // 2),
-                    font)
-        display.flip()
+        pause_rect = self.PAUSE_TEXT.get_rect(center=(self.width // 2,
+                                                      self.height // 2))
+        self.screen.blit(self.PAUSE_TEXT, pause_rect)
+        self.flip()
         waiting = True
         while waiting:
             for event in pygame.event.get():
@@ -1247,7 +3309,7 @@ class Game:
                 if event.type == pygame.KEYDOWN:
                     if event.key in (pygame.K_f, pygame.K_LSUPER,
                                      pygame.K_RSUPER):
-                        display.toggle_fullscreen()
+                        screen_manager.toggle_fullscreen()
                     elif event.key in (pygame.K_p, pygame.K_RETURN,
                                      pygame.K_ESCAPE):
                         waiting = False
@@ -1255,14 +3317,18 @@ class Game:
                     if sum(mouse.get_pressed()) >= 1:
                         waiting = False
                     else:
-                        display.toggle_fullscreen()
-            clock.tick(self.fps)
+                        screen_manager.toggle_fullscreen()
+            await scheduler.frame(self.fps)
         end_time = time() % (60 * 60 * 24 * 30)
         self.START_TIME += end_time - start_time
 
     def levelup(self):
+        self.particles.burst(self.energy_shatters.rect.center,
+                             self.particles.SHARD, 120, 180, 0.5)
         self.level += 1
         self.asteroids.level_up(self.level)
+        if self.level % self.MUSIC_LEVELS == 0:
+            bgmus_play(str(self.level // self.MUSIC_LEVELS))
 
     def score(self, play_time, death):
         score = [death, self.level,
@@ -1271,16 +3337,34 @@ class Game:
                            + 10 * self.rocket.fuel * (self.level - 1) ** 0.5))
         return score
 
-    def destroy(self, death):
+    async def destroy(self, death):
+        self.recorder.record(self, self.arrow_pressed)
+        self.recorder.dump(self, death)
         self.rocket.kill()
-        self.end_game(self.rocket.rect.center, death)
+        await self.explode()
+        await self.end_game(self.rocket.rect.center, death)
         raise Restart
 
-    def end_game(self, end_coord, death):
-        play_time = time() % (60 * 60 * 24 * 30) - self.START_TIME
+    async def explode(self):
+        """Взрыв ракеты: мир замирает, разлетаются только частицы"""
+        self.particles.budget = self.particles.CAPACITY
+        self.particles.burst(self.rocket.rect.center,
+                             self.particles.EXPLOSION, 600, 360, 1)
+        for _ in range(round(self.EXPLOSION_TIME * self.fps)):
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    raise Quit
+            self.particles.update()
+            self.blit()
+            self.flip()
+            await scheduler.frame(self.limit)
+
+    async def end_game(self, end_coord, death):
+        ended = time()
+        play_time = ended % (60 * 60 * 24 * 30) - self.START_TIME
         music.stop()
         score = self.score(play_time, death)
-        StatisticsFile().add_stat(score)
+        stat_writer.add_stat(score, ended)
         died = ["самоуничтожились", "погибли от столкновения",
                 "погибли от нехватки энергии"][score[0]]
         end_text = ["КОНЕЦ ИГРЫ",
@@ -1289,6 +3373,8 @@ class Game:
                     f"Средняя скорость продвижения: {score[2]}",
                     f"Счёт: {str(score[3])}",
                     " ",
+                    "R - заново",
+                    f"C - с начала уровня {self.checkpoint_level}",
                     "Нажмите дважды любую клавишу для выхода"]
         self.fon.blit()
         text_coord = list(end_coord)
@@ -1305,32 +3391,71 @@ class Game:
                 if event.type == pygame.KEYDOWN:
                     if event.key in (pygame.K_f, pygame.K_LSUPER,
                                      pygame.K_RSUPER):
-                        display.toggle_fullscreen()
+                        screen_manager.toggle_fullscreen()
+                    elif event.key == pygame.K_r:
+                        self.replay = True
+                        self.restart_time = perf_counter()
+                        waiting = 0
+                    elif event.key == pygame.K_c:
+                        self.replay = True
+                        self.resume = self.checkpoint
+                        self.restart_time = perf_counter()
+                        waiting = 0
                     else:
                         waiting -= 1
                 elif event.type == pygame.MOUSEBUTTONUP:
                     if sum(mouse.get_pressed()) >= 1:
                         waiting = 0
                     else:
-                        display.toggle_fullscreen()
-            display.flip()
-            clock.tick(self.fps)
+                        screen_manager.toggle_fullscreen()
+            if waiting > 0:
+                self.flip()
+                await scheduler.frame(self.fps)
+
+
+async def main():
+    scheduler.spawn('статистика', stat_writer.run())
+    scheduler.spawn('музыка', music.load_all())
+    scheduler.spawn('картинки', Game.preload())
+    while True:
+        await StartScreen().run()
+        await Game().play()
 
 
 if __name__ == "__main__":
     try:
         pygame.init()
         setter = SettingsFile()
-        music = pygame.mixer.music
+        if '--texture' in sys.argv:
+            setter.set('renderer', 'texture')
+        screen_manager = DisplayManager()
+        if '--latency' in sys.argv:
+            setter.set('latency', '1')
+        if '--profile' in sys.argv:
+            setter.set('profile', '1')
+        if '--allocations' in sys.argv:
+            setter.set('allocations', '1')
+        if '--pipeline' in sys.argv:
+            setter.set('pipeline', '1')
+        if '--uncapped' in sys.argv:
+            setter.set('pacing', 'uncapped')
+        if '--capture' in sys.argv:
+            setter.set('capture', 'raw')
+        if '--capture-png' in sys.argv:
+            setter.set('capture', 'png')
+        stat_writer = StatisticsWriter()
+        music = MusicPlayer()
         music.set_volume(0.72)
-        clock = pygame.time.Clock()
+        clock = FramePacer()
+        scheduler = FrameScheduler()
         display = pygame.display
         mouse = pygame.mouse
-        while True:
-            StartScreen()
-            Game()
+        scheduler.run(main())
     except Quit:
         pass
     finally:
+        if int(setter.get('profile')):
+            print(scheduler.report())
         setter.__del__()
+        stat_writer.close()
         Quit()
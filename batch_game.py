@@ -0,0 +1,387 @@
+"""
+Пакетный симулятор: N независимых игр в виде массивов NumPy.
+Повторяет правила Rocket.update, Asteroids.update/level_up и
+EnergyShatters.collect из Asteroid.py, но за один векторный проход на всех.
+Запуск как скрипта сверяет его с обычной игрой при одинаковых сидах.
+"""
+import os
+import random
+
+import numpy as np
+import pygame
+
+from Asteroid import Game, LevelCurve, World, sweep
+
+
+def carry_step(carry):
+    """
+    Векторная версия сдвига с остатком (Rocket.move): целая часть
+    накопленного carry (округление как у round) и новый остаток
+    """
+    step = np.round(carry)
+    return step.astype(np.int64), carry - step
+
+
+def half(a):
+    """Целочисленное деление на 2 с отбрасыванием к нулю, как в Rect.inflate"""
+    return np.sign(a) * (np.abs(a) // 2)
+
+
+def sprite_sizes():
+    """Размеры ракеты, астероида и кадра осколка по картинкам игры"""
+    def size(name):
+        return pygame.image.load(os.path.join('data', 'images', name)).get_size()
+    energy_w, energy_h = size('energy.png')
+    return {'rocket': size('rocket.png'),
+            'asteroid': size('asteroid.png'),
+            'energy': (energy_w // 6, energy_h // 4)}
+
+
+class BatchGame:
+    """
+    N игр, хранящихся столбцами: ракета (rx, ry, rw, rh, fuel),
+    слоты астероидов (ax, ay, alive), осколок (sx, sy), начало мира
+    (ox, oy), уровень и параметры астероидов (n, t0, v, i) для каждой игры.
+    Все координаты - в системе камеры, как у спрайтов в Game.
+    Мир каждой игры - тот же World, что и в обычной игре, от seed,
+    который берётся из своего random.Random у каждой игры при её начале,
+    поэтому при одинаковых сидах результаты совпадают; к миру обращаются
+    только игры, которым нужен новый астероид, новое место осколка
+    или которые перешли в другой кусок.
+    Закончившиеся игры сразу перезапускаются, их итоги копятся в results.
+    """
+    LEVEL_H = Game.LEVEL_H
+    PROFIT = 40
+
+    def __init__(self, n, width, height, seeds=None, fps=30,
+                 sizes=None, capacity=8):
+        if sizes is None:
+            sizes = sprite_sizes()
+        if seeds is None:
+            seeds = range(n)
+        self.n_games = n
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.rng = [random.Random(seed) for seed in seeds]
+
+        self.rocket_size = sizes['rocket']
+        self.ast_w, self.ast_h = sizes['asteroid']
+        self.shard_w, self.shard_h = sizes['energy']
+        self.rocket_v = 500 / fps
+        self.fuel_loss = 10 / fps
+
+        self.rx = np.zeros(n, np.int64)
+        self.ry = np.zeros(n, np.int64)
+        self.rw = np.zeros(n, np.int64)
+        self.rh = np.zeros(n, np.int64)
+        self.rcx = np.zeros(n)
+        self.rcy = np.zeros(n)
+        self.fuel = np.zeros(n)
+        self.level = np.zeros(n, np.int64)
+        self.frames = np.zeros(n, np.int64)
+
+        self.ast_n = np.zeros(n, np.int64)
+        self.ast_t0 = np.zeros(n)
+        self.ast_v = np.zeros(n)
+        self.ast_i = np.zeros(n, np.int64)
+        self.ax = np.zeros((n, capacity), np.int64)
+        self.ay = np.zeros((n, capacity), np.int64)
+        self.ac = np.zeros((n, capacity))
+        self.alive = np.zeros((n, capacity), bool)
+
+        self.sx = np.zeros(n, np.int64)
+        self.sy = np.zeros(n, np.int64)
+        self.ox = np.zeros(n, np.int64)
+        self.oy = np.zeros(n, np.int64)
+        self.chunk = np.zeros(n, np.int64)
+        self.worlds = [None] * n
+
+        self.results = []
+        self.reset(np.ones(n, bool))
+
+    def reset(self, mask):
+        """Начинает новые игры на месте отмеченных (как новый Game())"""
+        self.rx[mask] = self.width // 2
+        self.ry[mask] = self.height // 2
+        self.rw[mask], self.rh[mask] = self.rocket_size
+        self.rcx[mask] = 0
+        self.rcy[mask] = 0
+        self.fuel[mask] = 100
+        self.level[mask] = 1
+        self.frames[mask] = 0
+
+        self.set_level(mask)
+        self.ast_i[mask] = 0
+        self.alive[mask] = False
+
+        self.ox[mask] = 0
+        self.oy[mask] = 0
+        self.chunk[mask] = 0
+        for k in np.flatnonzero(mask):
+            self.worlds[k] = World(self.rng[k].getrandbits(32), self.width,
+                                   self.LEVEL_H)
+            self.sx[k], self.sy[k] = self.worlds[k].shard(0)
+
+    def world(self, k):
+        """Мир игры k с началом там же, где оно у игры сейчас"""
+        world = self.worlds[k]
+        world.rect.topleft = (int(self.ox[k]), int(self.oy[k]))
+        return world
+
+    def set_level(self, mask):
+        """Векторная версия Asteroids.level_up (по таблице LevelCurve)"""
+        density, period, speed = LevelCurve.lookup(self.level[mask])
+        self.ast_n[mask] = (density * self.width / 250).astype(np.int64)
+        self.ast_t0[mask] = self.fps / period
+        self.ast_v[mask] = speed * 80 / self.fps
+
+    def level_up(self, mask):
+        """Векторная версия Game.levelup + Asteroids.level_up"""
+        self.level[mask] += 1
+        self.set_level(mask)
+
+    def collect(self, mask):
+        """Векторная версия Rocket.collect + EnergyShatters.collect"""
+        self.fuel[mask] += self.PROFIT
+        self.level_up(mask)
+        for k in np.flatnonzero(mask):
+            self.sx[k], self.sy[k] = self.world(k).shard(int(self.level[k]) - 1)
+
+    def grow(self):
+        """Удваивает число слотов астероидов"""
+        extra = self.alive.shape[1]
+        self.ax = np.pad(self.ax, ((0, 0), (0, extra)))
+        self.ay = np.pad(self.ay, ((0, 0), (0, extra)))
+        self.ac = np.pad(self.ac, ((0, 0), (0, extra)))
+        self.alive = np.pad(self.alive, ((0, 0), (0, extra)))
+
+    def update_asteroids(self):
+        """Векторная версия Asteroids.update"""
+        self.ast_i += 1
+        self.ac = np.where(self.alive, self.ac + self.ast_v[:, None], self.ac)
+        step, self.ac = carry_step(self.ac)
+        self.ay = np.where(self.alive, self.ay + step, self.ay)
+        self.alive &= self.ay <= self.height
+
+        spawn = (self.ast_i >= self.ast_t0) & (self.ast_n >
+                                               self.alive.sum(axis=1))
+        if not spawn.any():
+            return None
+        self.ast_i[spawn] = 0
+        if self.alive[spawn].all(axis=1).any():
+            self.grow()
+        slots = np.argmin(self.alive[spawn], axis=1)
+        for (k, slot) in zip(np.flatnonzero(spawn), slots):
+            x, above = self.world(k).spawn()
+            self.ax[k, slot] = x
+            self.ay[k, slot] = -self.ast_h - above
+            self.ac[k, slot] = 0
+            self.alive[k, slot] = True
+
+    def apply_camera(self, mask):
+        """Векторная версия Camera.update + Camera.apply для всех спрайтов"""
+        dx = -(self.rx + self.rw // 2 - self.width // 2)
+        dy = -(self.ry + self.rh // 2 - 2 * self.height // 3)
+        dx = np.where(mask, dx, 0)
+        dy = np.where(mask, dy, 0)
+        cycle = self.width + 50
+        self.rx = np.where(mask, (self.rx + dx) % cycle, self.rx)
+        self.sx = np.where(mask, (self.sx + dx) % cycle, self.sx)
+        self.ox = np.where(mask, (self.ox + dx) % cycle, self.ox)
+        self.ax = np.where(mask[:, None], (self.ax + dx[:, None]) % cycle,
+                           self.ax)
+        self.ry += dy
+        self.sy += dy
+        self.oy += dy
+        self.ay += dy[:, None]
+
+        # World.prepare: куски выбрасываются только при смене текущего
+        chunk = self.oy // self.LEVEL_H
+        for k in np.flatnonzero(chunk != self.chunk):
+            self.world(k).prepare()
+        self.chunk = chunk
+
+    def score(self, k, death):
+        """Итог игры k так же, как в Game.score (время - по кадрам)"""
+        level = int(self.level[k])
+        play_time = self.frames[k] / self.fps
+        score = [death, level,
+                 int(self.fps * self.rocket_v * (level - 1) / play_time)]
+        score.append(round(level ** 2 * score[2] / 100
+                           + 10 * float(self.fuel[k]) * (level - 1) ** 0.5))
+        return score
+
+    def step(self, arrows):
+        """
+        Один кадр всех игр. arrows - массив (N, 4) нажатых стрелок
+        в порядке Вверх, Вниз, Вправо, Влево (как arrow_pressed в Game.run).
+        Возвращает массив типов смерти закончившихся на этом кадре игр
+        (-1 - игра продолжается); такие игры уже перезапущены.
+        """
+        arrows = np.asarray(arrows, bool)
+        up, down, right, left = arrows.T
+        self.frames += 1
+
+        # Rocket.drive
+        x0 = self.rx
+        y0 = self.ry
+        v = self.rocket_v
+        step_x, self.rcx = carry_step(
+            self.rcx + np.where(right, v, np.where(left, -v, 0)))
+        step_y, self.rcy = carry_step(
+            self.rcy + np.where(up, -v, np.where(down, v, 0)))
+        self.rx = self.rx + step_x
+        self.ry = self.ry + step_y
+        self.fuel = np.maximum(0, self.fuel - self.fuel_loss)
+        dx = self.rx - x0
+        dy = self.ry - y0
+
+        # Уменьшенный вдвое прямоугольник ракеты для пересечений
+        dw = -self.rw // 2
+        dh = -self.rh // 2
+        cx = self.rx - half(dw)
+        cy = self.ry - half(dh)
+        cw = self.rw + dw
+        ch = self.rh + dh
+
+        crash = sweep(cx[:, None], cy[:, None], cw[:, None], ch[:, None],
+                      dx[:, None], dy[:, None],
+                      self.ax, self.ay, self.ast_w, self.ast_h,
+                      0, self.ast_v[:, None]) <= 1
+        death = np.where((crash & self.alive).any(axis=1), 1, -1)
+        grab = sweep(cx, cy, cw, ch, dx, dy,
+                     self.sx, self.sy, self.shard_w, self.shard_h) <= 1
+        if grab.any():
+            self.collect(grab)
+
+        self.rx = cx - half(cw)
+        self.ry = cy - half(ch)
+        self.rw = cw + cw
+        self.rh = ch + ch
+        death = np.where(self.fuel <= 0, 2, death)
+
+        self.update_asteroids()
+
+        done = death >= 0
+        self.apply_camera(~done)
+        if done.any():
+            for k in np.flatnonzero(done):
+                self.results.append((k, self.score(k, int(death[k]))))
+            self.reset(done)
+        return death
+
+
+class ScalarGame:
+    """
+    Эталон для сверки: настоящие Rocket, EnergyShatters, Asteroids, Camera
+    и World из Asteroid.py без окна и цикла событий, шаг - как тело Game.run
+    """
+    LEVEL_H = Game.LEVEL_H
+
+    def __init__(self, width, height, seed, fps=30):
+        from Asteroid import (load_image, Rocket, EnergyShatters,
+                              Asteroids, Camera)
+        self.size = (self.width, self.height) = (width, height)
+        self.fps = fps
+        self.spr_images = {"energy": load_image("energy.png", -1),
+                           "rocket": load_image("rocket.png"),
+                           "asteroid": load_image("asteroid.png")}
+        self.all_sprites = pygame.sprite.Group()
+        self.picked_sprites = pygame.sprite.Group()
+        self.crash_sprites = pygame.sprite.Group()
+        self.player_group = pygame.sprite.Group()
+
+        self.level = 1
+        self.world = World(seed, width, self.LEVEL_H)
+        self.rocket = Rocket(self, self.all_sprites, self.player_group)
+        self.energy_shatters = EnergyShatters(self, self.all_sprites,
+                                              self.picked_sprites)
+        self.asteroids = Asteroids(self, self.all_sprites,
+                                   self.crash_sprites)
+        self.camera = Camera(self)
+
+    def levelup(self):
+        self.level += 1
+        self.asteroids.level_up(self.level)
+
+    def step(self, arrows):
+        self.all_sprites.update()
+        self.player_group.update(list(arrows))
+        self.asteroids.update()
+        if self.rocket.destroyed:
+            return self.rocket.destroyed
+        self.camera.update(self.rocket)
+        for sprite in self.all_sprites:
+            self.camera.apply(sprite)
+        self.camera.apply(self.world)
+        self.world.prepare()
+        return -1
+
+    def state(self):
+        return (tuple(self.rocket.rect), round(self.rocket.fuel, 6),
+                self.level, tuple(self.energy_shatters.rect.topleft),
+                sorted(tuple(ast.rect.topleft)
+                       for ast in self.asteroids.asteroids))
+
+
+def batch_state(batch, k):
+    alive = batch.alive[k]
+    return ((int(batch.rx[k]), int(batch.ry[k]),
+             int(batch.rw[k]), int(batch.rh[k])),
+            round(float(batch.fuel[k]), 6), int(batch.level[k]),
+            (int(batch.sx[k]), int(batch.sy[k])),
+            sorted(zip(batch.ax[k][alive].tolist(),
+                       batch.ay[k][alive].tolist())))
+
+
+def check_parity(seeds=(0, 1, 2, 3), steps=3000, size=(1280, 720)):
+    """
+    Гоняет пакет из len(seeds) игр и по обычной игре на каждый сид
+    с одинаковыми случайными нажатиями, сверяя состояние после каждого кадра
+    """
+    pygame.display.set_mode((1, 1))
+    rng = np.random.default_rng(0)
+    actions = rng.random((steps, len(seeds), 4)) < 0.3
+    actions[:, :, 0] |= rng.random((steps, len(seeds))) < 0.5
+
+    batch = BatchGame(len(seeds), *size, seeds=seeds)
+    deaths = []
+    states = []
+    for t in range(steps):
+        deaths.append(batch.step(actions[t]))
+        states.append([batch_state(batch, k) for k in range(len(seeds))])
+
+    for (k, seed) in enumerate(seeds):
+        runs = random.Random(seed)
+        scalar = ScalarGame(*size, runs.getrandbits(32))
+        for t in range(steps):
+            death = scalar.step(actions[t, k])
+            if death != deaths[t][k]:
+                raise AssertionError(f"игра {k}, кадр {t}: смерть "
+                                     f"{death} != {deaths[t][k]}")
+            if death >= 0:
+                scalar = ScalarGame(*size, runs.getrandbits(32))
+            if states[t][k] != scalar.state():
+                raise AssertionError(f"игра {k}, кадр {t}:\n"
+                                     f"{states[t][k]}\n{scalar.state()}")
+    return batch.results
+
+
+def benchmark(n=1024, steps=300, size=(1280, 720)):
+    """Кадров в секунду суммарно по всем играм пакета"""
+    from time import perf_counter
+    batch = BatchGame(n, *size)
+    actions = np.random.default_rng(0).random((steps, n, 4)) < 0.3
+    start = perf_counter()
+    for t in range(steps):
+        batch.step(actions[t])
+    return n * steps / (perf_counter() - start)
+
+
+if __name__ == "__main__":
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    pygame.init()
+    results = check_parity()
+    print(f"Совпадение с обычной игрой: да, завершённых игр {len(results)}")
+    print(f"Пакет из 1024 игр: {benchmark():.0f} игровых кадров в секунду")
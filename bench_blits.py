@@ -0,0 +1,83 @@
+"""
+Сравнение отрисовки кадра: прежний путь (отдельный blit на каждую плитку
+фона и Group.draw) и один Surface.blits на весь кадр, как в Game.blit.
+Запуск: python bench_blits.py [ширина высота]
+"""
+import os
+import sys
+from itertools import product
+from random import randint, seed
+from time import perf_counter
+
+import pygame
+
+from Asteroid import load_image
+
+FRAMES = 300
+
+
+def scene(size, n):
+    """Плитки фона, n астероидов, осколок и ракета, как в игре"""
+    sky = load_image('sky.jpg')
+    asteroid = load_image('asteroid.png')
+    energy = load_image('energy.png', -1)
+    rocket = load_image('rocket.png')
+    sky_rect = sky.get_rect()
+    tiles = [(sky, sky_rect.move(*shift))
+             for shift in product(range(-sky_rect.w, size[0], sky_rect.w),
+                                  range(-sky_rect.h, size[1], sky_rect.h))]
+
+    seed(0)
+    all_sprites = pygame.sprite.Group()
+    player_group = pygame.sprite.Group()
+    for _ in range(n):
+        sprite = pygame.sprite.Sprite(all_sprites)
+        sprite.image = asteroid
+        sprite.rect = asteroid.get_rect().move(randint(0, size[0]),
+                                               randint(0, size[1]))
+    shard = pygame.sprite.Sprite(all_sprites)
+    shard.image = energy.subsurface((0, 0, energy.get_width() // 6,
+                                     energy.get_height() // 4))
+    shard.rect = shard.image.get_rect().move(size[0] // 3, size[1] // 3)
+    player = pygame.sprite.Sprite(all_sprites, player_group)
+    player.image = rocket
+    player.rect = rocket.get_rect().move(size[0] // 2, size[1] // 2)
+    return tiles, all_sprites, player_group
+
+
+def per_call(screen, tiles, all_sprites, player_group):
+    for (image, rect) in tiles:
+        screen.blit(image, rect)
+    for sprite in all_sprites:
+        screen.blit(sprite.image, sprite.rect)
+    for sprite in player_group:
+        screen.blit(sprite.image, sprite.rect)
+
+
+def batched(screen, tiles, all_sprites, player_group):
+    frame = list(tiles)
+    frame += [(sprite.image, sprite.rect) for sprite in all_sprites]
+    frame += [(sprite.image, sprite.rect) for sprite in player_group]
+    screen.blits(frame, doreturn=False)
+
+
+def measure(draw, screen, *args):
+    draw(screen, *args)
+    start = perf_counter()
+    for _ in range(FRAMES):
+        draw(screen, *args)
+    return 1000 * (perf_counter() - start) / FRAMES
+
+
+if __name__ == "__main__":
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    size = tuple(int(x) for x in sys.argv[1:3]) or (1920, 1080)
+    pygame.init()
+    screen = pygame.display.set_mode(size)
+    print(f"{size[0]}x{size[1]}, мс на кадр (среднее за {FRAMES})")
+    print(f"{'астероидов':>10} {'blit':>8} {'blits':>8}")
+    for n in (10, 50, 200, 1000):
+        args = scene(size, n)
+        old = measure(per_call, screen, *args)
+        new = measure(batched, screen, *args)
+        print(f"{n:>10} {old:>8.3f} {new:>8.3f}")
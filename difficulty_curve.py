@@ -0,0 +1,151 @@
+"""
+Кривая сложности по LevelCurve: сколько астероидов одновременно (n, при
+нескольких ширинах экрана), как часто они появляются (t0) и как быстро
+летят (v) на уровнях 1..LevelCurve.LEVELS. Период - в секундах, скорость -
+в пикселях в секунду, поэтому от частоты кадров они не зависят.
+Печатает изломы кривой: спад (с уровнем игра становится легче) и скачок
+(шаг больше JUMP медиан соседних шагов), и рисует графики с отмеченными
+изломами.
+Запуск: python difficulty_curve.py [--png файл]
+--png сохраняет графики в файл вместо окна.
+"""
+import os
+import sys
+
+import numpy as np
+import pygame
+from numpy.lib.stride_tricks import sliding_window_view
+
+from Asteroid import LevelCurve, get_font
+
+FONT_NAME = os.path.join('data', 'mr_AfronikG.ttf')
+WIDTHS = (640, 960, 1280, 1920)
+WINDOW = 5  # соседних шагов с каждой стороны для медианы
+JUMP = 4
+SIZE = (1200, 900)
+MARGIN = 60
+COLORS = ('#4fc3f7', '#81c784', '#ffb74d', '#e57373')
+
+
+def curve(levels, widths=WIDTHS):
+    """Параметры уровней levels: n (ширина x уровень), период, скорость"""
+    density, period, speed = LevelCurve.lookup(levels)
+    n = (density * np.asarray(widths)[:, np.newaxis] / 250).astype(np.int64)
+    return {'n': n, 'period': 1 / period, 'speed': speed * 80}
+
+
+def breaks(values, harder=1):
+    """
+    Индексы уровней, на которых кривая ломается: (спады, скачки).
+    harder - знак, с которым рост значения усложняет игру
+    """
+    steps = np.diff(values) * harder
+    size = np.abs(steps)
+    nonzero = size[size > 0]
+    floor = np.median(nonzero) if nonzero.size else 0
+    window = sliding_window_view(np.pad(size, WINDOW, mode='edge'),
+                                 2 * WINDOW + 1)
+    typical = np.maximum(np.median(window, axis=1), floor)
+    falls = np.flatnonzero(steps < 0) + 1
+    jumps = np.flatnonzero(steps > JUMP * typical) + 1
+    return falls, jumps
+
+
+def report(levels, data):
+    """Печатает изломы каждой кривой"""
+    series = [(f"n при ширине {w}", data['n'][i], 1)
+              for (i, w) in enumerate(WIDTHS)]
+    series += [("период появления, с", data['period'], -1),
+               ("скорость, пикс/с", data['speed'], 1)]
+    found = {}
+    for (name, values, harder) in series:
+        falls, jumps = breaks(values, harder)
+        found[name] = (falls, jumps)
+        print(name)
+        for (kind, where) in (("спад", falls), ("скачок", jumps)):
+            if where.size:
+                print(f"  {kind} на уровнях:",
+                      ', '.join(str(levels[i]) for i in where))
+    return found
+
+
+def plot(surface, rect, levels, lines, marks, title, font):
+    """Графики lines (список (значения, цвет)) в rect с изломами marks"""
+    pygame.draw.rect(surface, pygame.Color('#303030'), rect, 1)
+    top = max(values.max() for (values, _) in lines)
+    bottom = min(0, min(values.min() for (values, _) in lines))
+    span = (top - bottom) or 1
+
+    def point(i, value):
+        return (rect.left + (levels[i] - levels[0]) * rect.width
+                / (levels[-1] - levels[0]),
+                rect.bottom - (value - bottom) * rect.height / span)
+
+    for (values, color) in lines:
+        pygame.draw.lines(surface, pygame.Color(color), False,
+                          [point(i, v) for (i, v) in enumerate(values)])
+    for (values, color, where) in marks:
+        for i in where:
+            pygame.draw.circle(surface, pygame.Color('#ff1744'),
+                               [round(c) for c in point(i, values[i])], 3)
+    surface.blit(font.render(f"{title}: {bottom:g}..{top:.4g}", True,
+                             pygame.Color('white')),
+                 (rect.left + 5, rect.top + 5))
+
+
+def draw(levels, data, found):
+    surface = pygame.Surface(SIZE)
+    surface.fill(pygame.Color('#101018'))
+    font = get_font(FONT_NAME, 20)
+    height = (SIZE[1] - MARGIN) // 3
+    rects = [pygame.Rect(MARGIN, MARGIN // 2 + k * height,
+                         SIZE[0] - 2 * MARGIN, height - MARGIN // 2)
+             for k in range(3)]
+
+    names = [f"n при ширине {w}" for w in WIDTHS]
+    lines = list(zip(data['n'], COLORS))
+    marks = [(values, color, np.union1d(*found[name]))
+             for (name, (values, color)) in zip(names, lines)]
+    plot(surface, rects[0], levels, lines, marks,
+         "Астероидов (ширины " + ', '.join(map(str, WIDTHS)) + ")", font)
+    for (rect, key, name) in ((rects[1], 'period', "период появления, с"),
+                              (rects[2], 'speed', "скорость, пикс/с")):
+        values = data[key]
+        plot(surface, rect, levels, [(values, COLORS[0])],
+             [(values, COLORS[0], np.union1d(*found[name]))], name, font)
+    surface.blit(font.render(f"уровни {levels[0]}..{levels[-1]}, "
+                             "красные точки - изломы", True,
+                             pygame.Color('white')),
+                 (MARGIN, SIZE[1] - MARGIN // 2))
+    return surface
+
+
+def show(surface):
+    screen = pygame.display.set_mode(surface.get_size())
+    pygame.display.set_caption("Кривая сложности")
+    screen.blit(surface, (0, 0))
+    pygame.display.flip()
+    clock = pygame.time.Clock()
+    while True:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                return None
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
+                return None
+        clock.tick(10)
+
+
+if __name__ == "__main__":
+    pygame.init()
+    levels = np.arange(1, LevelCurve.LEVELS + 1)
+    data = curve(levels)
+    found = report(levels, data)
+    surface = draw(levels, data, found)
+    if '--png' in sys.argv:
+        i = sys.argv.index('--png')
+        path = sys.argv[i + 1] if len(sys.argv) > i + 1 else 'difficulty.png'
+        pygame.image.save(surface, path)
+        print(f"Графики сохранены в {path}")
+    else:
+        show(surface)
+    pygame.quit()
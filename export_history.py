@@ -0,0 +1,14 @@
+"""
+Выгрузка истории игр (RunHistory, data/history) в CSV для разбора вне игры.
+Столбцы: time (секунды с начала эпохи), death (0 - самоуничтожение,
+1 - столкновение, 2 - нехватка энергии), level, speed, score.
+Запуск: python export_history.py [файл]
+"""
+import sys
+
+from Asteroid import RunHistory
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else 'history.csv'
+    runs = RunHistory().export(path)
+    print(f"Выгружено игр: {runs} -> {path}")
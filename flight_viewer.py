@@ -0,0 +1,111 @@
+"""
+Просмотр записи бортового самописца (FlightRecorder): последние секунды
+игры перед гибелью по кадрам, с ракетой, осколком, ближайшими астероидами,
+энергией, уровнем и нажатыми стрелками.
+Пробел - пауза, стрелки влево/вправо - кадр назад/вперёд (на паузе),
+Home - с начала, Esc - выход.
+Запуск: python flight_viewer.py [файл] (по умолчанию последняя запись)
+"""
+import os
+import sys
+from itertools import product
+
+import pygame
+
+from Asteroid import FlightRecorder, Fon, get_font, load_image, render_text
+
+FONT_NAME = os.path.join('data', 'mr_AfronikG.ttf')
+DEATHS = ("самоуничтожение", "столкновение", "нехватка энергии")
+ARROW_NAMES = ("вверх", "вниз", "вправо", "влево")
+
+
+class FlightViewer:
+    """Окно размера записанного экрана, рисует кадры записи по одному"""
+
+    def __init__(self, path):
+        self.header, self.frames = FlightRecorder.load(path)
+        self.size = (self.width, self.height) = (int(self.header['width']),
+                                                 int(self.header['height']))
+        self.screen = pygame.display.set_mode(self.size)
+        pygame.display.set_caption(os.path.basename(path))
+        self.fon = Fon(self)
+        self.font = get_font(FONT_NAME, 25)
+        rocket = load_image('rocket.png')
+        # как Rocket.rotate: вправо -1, влево 1
+        self.rockets = {r: pygame.transform.rotate(rocket, 45 * r)
+                        for r in (-1, 1)}
+        self.rockets[0] = rocket
+        self.asteroid = load_image('asteroid.png')
+        energy = load_image('energy.png', -1)
+        w, h = energy.get_width() // 6, energy.get_height() // 4
+        self.shards = [energy.subsurface((w * i, h * j, w, h))
+                       for (j, i) in product(range(4), range(6))]
+
+    def render(self, i):
+        frame = self.frames[i]
+        self.fon.rect.topleft = frame['fon']
+        self.fon.blit()
+        self.screen.blits([(self.asteroid, tuple(pos)) for pos in
+                           frame['asteroids'][:frame['asteroids_n']]],
+                          doreturn=False)
+        self.screen.blit(self.shards[frame['shard_frame']],
+                         tuple(frame['shard']))
+        arrows = [bool(frame['arrows'] >> bit & 1) for bit in range(4)]
+        rotation = -1 if arrows[2] else 1 if arrows[3] else 0
+        self.screen.blit(self.rockets[rotation], tuple(frame['rocket']))
+
+        seconds = (i + 1 - len(self.frames)) / self.header['fps']
+        pressed = ', '.join(name for (name, on) in zip(ARROW_NAMES, arrows)
+                            if on) or '-'
+        lines = (f"Кадр {i + 1}/{len(self.frames)} ({seconds:+.2f} с)",
+                 f"Уровень: {frame['level']}  Энергия: {frame['fuel']:.1f}",
+                 f"Стрелки: {pressed}",
+                 f"Гибель: {DEATHS[self.header['death']]}")
+        y = 10
+        for line in lines:
+            y += 5 + render_text(self.screen, line, (self.width // 2, y),
+                                 self.font)
+        pygame.display.flip()
+
+    def run(self):
+        clock = pygame.time.Clock()
+        i = 0
+        playing = True
+        while True:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    return None
+                if event.type == pygame.KEYDOWN:
+                    if event.key == pygame.K_ESCAPE:
+                        return None
+                    elif event.key == pygame.K_SPACE:
+                        playing = not playing
+                    elif event.key == pygame.K_HOME:
+                        i = 0
+                    elif event.key == pygame.K_RIGHT and not playing:
+                        i = min(i + 1, len(self.frames) - 1)
+                    elif event.key == pygame.K_LEFT and not playing:
+                        i = max(i - 1, 0)
+            self.render(i)
+            if playing:
+                if i < len(self.frames) - 1:
+                    i += 1
+                else:
+                    playing = False  # последний кадр - момент гибели
+            clock.tick(self.header['fps'])
+
+
+def latest():
+    names = []
+    if os.path.isdir(FlightRecorder.DIR):
+        names = sorted(os.listdir(FlightRecorder.DIR))
+    if not names:
+        sys.exit("Записей самописца нет")
+    return os.path.join(FlightRecorder.DIR, names[-1])
+
+
+if __name__ == "__main__":
+    pygame.init()
+    path = sys.argv[1] if len(sys.argv) > 1 else latest()
+    FlightViewer(path).run()
+    pygame.quit()
@@ -0,0 +1,182 @@
+"""
+Замер целого кадра Game.run без окна: заданные полёты (ракета летит вверх,
+виляя) на нескольких разрешениях и уровнях - начало игры, 20 и 60
+(уровень набирается через Game.levelup). Ракета в замере неуязвима.
+Для каждого сценария собирается распределение времени кадра и
+сравнивается с базой в BASELINES: если p50 или p99 выросли больше
+допуска или базы для сценария нет - завершается с кодом 1.
+Запуск: python frame_bench.py [--update] [--texture] [кадров]
+--update записывает текущие результаты как базу (база зависит от машины,
+поэтому её записывают на той, где сравнивают).
+--texture гоняет те же сценарии с отрисовкой через TextureScreen
+(настройка renderer = texture); их база хранится отдельно, с приставкой
+"texture" в имени сценария, так что оба способа отрисовки сравнимы.
+"""
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+from time import perf_counter
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import numpy as np
+import pygame
+
+import Asteroid
+from soak import Pressed
+
+BASELINES = 'frame_baselines.json'
+RESOLUTIONS = ((960, 540), (1280, 720), (1920, 1080))
+LEVELS = (1, 20, 60)
+WARMUP = 30
+TOLERANCE = {'p50': 0.15, 'p99': 0.50}  # допустимый рост над базой
+PERCENTILES = (10, 50, 90, 99, 99.9)
+
+
+class ScenarioDone(Exception):
+    """Сценарий набрал нужное число кадров"""
+
+
+class ScenarioClock:
+    """Часы без ожидания, которые запоминают время каждого кадра"""
+
+    def __init__(self, frames):
+        self.frames = frames
+        self.times = []
+        self.last = None
+
+    def tick(self, framerate=0):
+        now = perf_counter()
+        if self.last is not None:
+            self.times.append(now - self.last)
+        self.last = now
+        if len(self.times) >= self.frames:
+            raise ScenarioDone
+        return 0
+
+
+class ScenarioGame(Asteroid.Game):
+    """Игра сразу на уровне level, с одинаковым миром и неуязвимой ракетой"""
+    level_start = 1
+
+    def reset(self):
+        random.seed(0)
+        super().reset()
+        self.particles.rng = np.random.default_rng(0)
+        for _ in range(self.level_start - 1):
+            self.levelup()
+
+    async def destroy(self, death):
+        self.rocket.destroyed = 0
+        self.rocket.fuel = 100
+
+
+def flight(frame):
+    """Стрелки кадра: вверх всегда, вправо и влево по очереди"""
+    keys = {pygame.K_UP}
+    if frame % 80 < 30:
+        keys.add(pygame.K_RIGHT)
+    elif 40 <= frame % 80 < 70:
+        keys.add(pygame.K_LEFT)
+    return keys
+
+
+def run_scenario(size, level, frames, texture=False):
+    Asteroid.setter.set('size', 'x'.join(map(str, size)))
+    clock = Asteroid.clock = ScenarioClock(WARMUP + frames)
+    counter = [0]
+
+    def get_pressed():
+        counter[0] += 1
+        return Pressed(flight(counter[0]))
+
+    pygame.key.get_pressed = get_pressed
+    ScenarioGame.level_start = level
+    try:
+        Asteroid.scheduler.run(ScenarioGame().play())
+    except ScenarioDone:
+        pygame.event.set_allowed(None)
+    if texture and not isinstance(Asteroid.screen_manager.screen,
+                                  Asteroid.TextureScreen):
+        raise RuntimeError("TextureScreen недоступен: нужен pygame 2 с SDL2")
+    times = np.array(clock.times[WARMUP:]) * 1000
+    return {f'p{q:g}': float(np.percentile(times, q)) for q in PERCENTILES}
+
+
+def run_all(frames=600, texture=False):
+    pygame.init()
+    stats = tempfile.NamedTemporaryFile(suffix='.txt', delete=False)
+    stats.close()
+    Asteroid.StatisticsFile.NAME = stats.name
+    Asteroid.RunHistory.DIR = tempfile.mkdtemp()
+    Asteroid.FlightRecorder.DIR = tempfile.mkdtemp()
+    Asteroid.setter = Asteroid.SettingsFile()
+    if texture:
+        Asteroid.setter.set('renderer', 'texture')
+    Asteroid.stat_writer = Asteroid.StatisticsWriter(interval=0.1)
+    Asteroid.music = Asteroid.MusicPlayer()
+    Asteroid.scheduler = Asteroid.FrameScheduler(idle=False)
+    Asteroid.display = pygame.display
+    Asteroid.mouse = pygame.mouse
+    Asteroid.screen_manager = Asteroid.DisplayManager()
+    pygame.event.get = lambda *args, **kwargs: pygame.event.pump() or []
+
+    results = {}
+    try:
+        for size in RESOLUTIONS:
+            for level in LEVELS:
+                name = f"{size[0]}x{size[1]} уровень {level}"
+                if texture:
+                    name = 'texture ' + name
+                results[name] = run_scenario(size, level, frames, texture)
+                print(name.ljust(32), ' '.join(
+                    f"{key} {value:7.2f}" for (key, value)
+                    in results[name].items()), "мс")
+    finally:
+        Asteroid.stat_writer.close()
+        os.remove(stats.name)
+        shutil.rmtree(Asteroid.RunHistory.DIR)
+        shutil.rmtree(Asteroid.FlightRecorder.DIR)
+        del Asteroid.setter
+    return results
+
+
+def compare(results, baselines):
+    """Возвращает список регрессий относительно базы и сценариев без базы"""
+    regressions = []
+    for (name, result) in results.items():
+        base = baselines.get(name)
+        if base is None:
+            regressions.append(f"{name}: базы нет (запишите её с --update)")
+            continue
+        for (key, tolerance) in TOLERANCE.items():
+            if result[key] > base[key] * (1 + tolerance):
+                regressions.append(f"{name}: {key} {result[key]:.2f} мс, "
+                                   f"база {base[key]:.2f} мс")
+    return regressions
+
+
+if __name__ == "__main__":
+    update = '--update' in sys.argv
+    args = [int(x) for x in sys.argv[1:] if x.isdigit()]
+    results = run_all(*args, texture='--texture' in sys.argv)
+    baselines = {}
+    if os.path.exists(BASELINES):
+        with open(BASELINES, encoding='utf-8') as f:
+            baselines = json.load(f)
+    if update:
+        # база другого способа отрисовки остаётся
+        baselines.update(results)
+        with open(BASELINES, 'w', encoding='utf-8') as f:
+            json.dump(baselines, f, ensure_ascii=False, indent=1)
+        print(f"База записана в {BASELINES}")
+        sys.exit(0)
+    regressions = compare(results, baselines)
+    if regressions:
+        print("Кадр стал медленнее или не с чем сравнить:")
+        print('\n'.join(regressions))
+        sys.exit(1)
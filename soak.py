@@ -0,0 +1,151 @@
+"""
+Долгий прогон игры без окна: много игр подряд с перезапусками
+(как после R или гибели), со случайными стрелками.
+После каждой игры записывает RSS процесса и число живых объектов;
+если после разгона они продолжают расти - завершается с кодом 1.
+Запуск: python soak.py [игр] [кадров до самоуничтожения]
+"""
+import gc
+import os
+import shutil
+import sys
+import tempfile
+from random import Random
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame
+
+import Asteroid
+
+OBJECTS_GROWTH = 0.02  # допустимый рост второй половины прогона над первой
+RSS_GROWTH = 0.05
+
+
+class Pressed:
+    """Замена pygame.key.get_pressed() с заданным набором клавиш"""
+
+    def __init__(self, keys):
+        self.keys = keys
+
+    def __getitem__(self, key):
+        return key in self.keys
+
+
+class ScriptedInput:
+    """
+    Подменяет ввод игры: стрелки меняются случайно каждые 10 кадров,
+    через limit кадров после начала игры нажимается R (самоуничтожение),
+    затем каждый кадр - Enter (выход с экрана конца игры)
+    """
+
+    def __init__(self, seed=0, limit=200):
+        self.rng = Random(seed)
+        self.limit = limit
+        self.frame = 0
+        self.start = 0
+        self.keys = set()
+
+    def new_game(self):
+        self.start = self.frame
+
+    def get(self, *args, **kwargs):
+        pygame.event.pump()
+        self.frame += 1
+        if self.frame % 10 == 0:
+            self.keys = {key for key in Asteroid.ARROWS
+                         if self.rng.random() < 0.3}
+            self.keys.add(pygame.K_UP)
+        frame = self.frame - self.start
+        if frame < self.limit:
+            return []
+        key = pygame.K_r if frame == self.limit else pygame.K_RETURN
+        return [pygame.event.Event(pygame.KEYDOWN, key=key, mod=0,
+                                   unicode='', scancode=0)]
+
+    def get_pressed(self):
+        return Pressed(self.keys)
+
+
+class NoWaitClock:
+    """Часы без ожидания: прогон идёт так быстро, как позволяет кадр"""
+
+    def tick(self, framerate=0):
+        return 0
+
+
+def rss():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def growth(values):
+    """Рост среднего второй половины над первой, в долях"""
+    half = len(values) // 2
+    first = sum(values[:half]) / half
+    second = sum(values[half:]) / (len(values) - half)
+    return (second - first) / first
+
+
+def soak(games=200, limit=300):
+    pygame.init()
+    stats = tempfile.NamedTemporaryFile(suffix='.txt', delete=False)
+    stats.close()
+    Asteroid.StatisticsFile.NAME = stats.name
+    Asteroid.RunHistory.DIR = tempfile.mkdtemp()
+    Asteroid.FlightRecorder.DIR = tempfile.mkdtemp()
+    Asteroid.setter = Asteroid.SettingsFile()
+    Asteroid.setter.set('size', '640x480')
+    Asteroid.stat_writer = Asteroid.StatisticsWriter(interval=0.1)
+    Asteroid.music = Asteroid.MusicPlayer()
+    Asteroid.clock = NoWaitClock()
+    Asteroid.scheduler = Asteroid.FrameScheduler(idle=False)
+    Asteroid.display = pygame.display
+    Asteroid.mouse = pygame.mouse
+    Asteroid.screen_manager = Asteroid.DisplayManager()
+
+    scripted = ScriptedInput(limit=limit)
+    pygame.event.get = scripted.get
+    pygame.key.get_pressed = scripted.get_pressed
+
+    warmup = max(2, games // 5)
+    sizes = []
+    objects = []
+
+    async def play():
+        Asteroid.scheduler.spawn('статистика', Asteroid.stat_writer.run())
+        for i in range(games):
+            scripted.new_game()
+            await Asteroid.Game().play()
+            gc.collect()
+            sizes.append(rss())
+            objects.append(len(gc.get_objects()))
+            print(f"игра {i + 1:>4}: RSS {sizes[-1] / 2 ** 20:8.1f} МБ, "
+                  f"объектов {objects[-1]}")
+
+    try:
+        Asteroid.scheduler.run(play())
+    finally:
+        Asteroid.stat_writer.close()
+        os.remove(stats.name)
+        shutil.rmtree(Asteroid.RunHistory.DIR)
+        shutil.rmtree(Asteroid.FlightRecorder.DIR)
+        del Asteroid.setter
+
+    rss_growth = growth(sizes[warmup:])
+    objects_growth = growth(objects[warmup:])
+    print(f"Рост после разгона: RSS {rss_growth:+.1%}, "
+          f"объектов {objects_growth:+.1%}")
+    return rss_growth <= RSS_GROWTH and objects_growth <= OBJECTS_GROWTH
+
+
+if __name__ == "__main__":
+    args = [int(x) for x in sys.argv[1:3]]
+    if not soak(*args):
+        print("Память растёт от игры к игре")
+        sys.exit(1)